@@ -2,18 +2,148 @@
 Flask后端应用
 """
 import os
-from flask import Flask, request, jsonify, send_file
+import json
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from pptx import Presentation
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 from ppt_processor import PPTProcessor
-from translator import Translator
+from translator import Translator, get_translator
+from translation_pipeline import translate_presentation
+from streaming_pipeline import translate_streaming, use_low_memory
+from job_manager import JobManager, TranslationJob, job_store_from_env
+from translation_memory import get_translation_memory
+from result_cache import get_result_cache
+from slide_store import get_slide_store
+from text_classifier import get_text_classifier
+from metrics import REGISTRY, stage_timer
+from upload_stream import StreamingRequest, validate_pptx, MAX_UPLOAD_BYTES
 import uuid
 
 app = Flask(__name__)
+# 上传文件边接收边写盘，超过大小上限的请求直接返回413
+app.request_class = StreamingRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 CORS(app)
 
-# 创建必要的目录
-os.makedirs('uploads', exist_ok=True)
-os.makedirs('outputs', exist_ok=True)
+# 后台翻译任务（状态快照写入 JOB_STATE_DIR，多个工作进程之间共享），在下方的服务进程初始化中创建
+job_manager = None
+# 任务事件流没有新事件时发送心跳的间隔（秒），避免代理断开空闲连接
+SSE_KEEPALIVE = 15
+
+
+def _memory_stat(name: str) -> float:
+    """读取翻译记忆库的统计值（未启用时为0）"""
+    memory = get_translation_memory()
+    return memory.stats()[name] if memory else 0
+
+
+# 服务进程初始化。`python3 app.py` 启动时，xml引擎的并行提取进程（spawn方式）会以 __mp_main__
+# 名称重新导入本文件，这些子进程只执行提取函数，不创建目录、任务管理器（及其线程）和监控指标
+if __name__ != '__mp_main__':
+    # 创建必要的目录
+    os.makedirs('uploads', exist_ok=True)
+    os.makedirs('outputs', exist_ok=True)
+
+    job_manager = JobManager(store=job_store_from_env())
+
+    # 导出时读取当前值的指标
+    REGISTRY.gauge('ppt_translator_active_jobs', '排队中和执行中的翻译任务数',
+                   job_manager.active_count)
+    REGISTRY.gauge('ppt_translator_memory_entries', '翻译记忆库条目数',
+                   lambda: _memory_stat('entries'))
+    REGISTRY.gauge('ppt_translator_memory_hits', '翻译记忆库累计命中数',
+                   lambda: _memory_stat('hits'))
+    REGISTRY.gauge('ppt_translator_memory_misses', '翻译记忆库累计未命中数',
+                   lambda: _memory_stat('misses'))
+    REGISTRY.gauge('ppt_translator_memory_hit_rate', '翻译记忆库命中率',
+                   lambda: _memory_stat('hit_rate'))
+
+
+def warm_up():
+    """
+    预热当前进程：创建共享的翻译器和HTTP连接池，加载python-pptx默认模板，打开翻译记忆库等共享组件
+    
+    生产环境由gunicorn在每个工作进程开始接收请求之前调用（见 gunicorn.conf.py），
+    第一个任务不再承担这些初始化开销。
+    """
+    try:
+        get_translator()
+    except Exception as e:
+        # 例如缺少API Key：进程照常启动，提交任务时再返回错误
+        print(f"⚠️  翻译客户端预热失败: {e}")
+    Presentation()
+    get_text_classifier()
+    get_translation_memory()
+    get_result_cache()
+    get_slide_store()
+
+
+def run_translation_job(job: TranslationJob, input_path: str, output_path: str,
+                        translator: Translator, cache_key: str = None) -> dict:
+    """
+    执行翻译任务（在后台工作线程中运行）
+    
+    Args:
+        job: 翻译任务
+        input_path: 上传的PPT文件路径
+        output_path: 输出文件路径
+        translator: 翻译器
+        cache_key: 结果缓存键，完成后登记到结果缓存
+        
+    Returns:
+        任务结果字典
+    """
+    # 流式模式下每条译文一解析出来就推送到任务事件流（item事件）
+    item_callback = job.add_item if translator.streaming else None
+    
+    if use_low_memory(input_path):
+        # 大PPT按幻灯片窗口流式处理（提取、翻译、回填、写出逐窗口完成），峰值内存不随页数增长
+        with stage_timer('stream'):
+            stats = translate_streaming(input_path, output_path, translator,
+                                        progress_callback=job.set_progress,
+                                        batch_callback=job.add_translations,
+                                        cancel_event=job.cancel_event,
+                                        item_callback=item_callback)
+        return _finish_job(job, output_path, stats, cache_key)
+    
+    # 处理PPT（各阶段耗时记录到 /metrics）
+    with stage_timer('load'):
+        processor = PPTProcessor(input_path)
+    with stage_timer('extract'):
+        slides_data = processor.extract_texts()
+    job.set_progress(0, len(slides_data))
+    
+    # 翻译（使用DeepSeek API，幻灯片请求并发发送，按顺序回填）
+    # 相同文本在整份PPT中只翻译一次，统计信息中包含去重比例
+    # 修改后重新上传时，指纹未变的幻灯片复用之前的译文（slides_reused）
+    # 每个请求完成时立即推送到任务事件流（/jobs/<job_id>/events），任务取消时停止发送剩余请求
+    with stage_timer('translate'):
+        stats = translate_presentation(processor, translator, slides_data,
+                                       progress_callback=job.set_progress,
+                                       slide_store=get_slide_store(),
+                                       result_id=job.file_id,
+                                       batch_callback=job.add_translations,
+                                       cancel_event=job.cancel_event,
+                                       item_callback=item_callback)
+    
+    # 保存翻译后的文件
+    with stage_timer('save'):
+        processor.save(output_path)
+    
+    return _finish_job(job, output_path, stats, cache_key)
+
+
+def _finish_job(job: TranslationJob, output_path: str, stats: dict, cache_key: str = None) -> dict:
+    """组装任务结果并登记到结果缓存（有文本翻译失败或任务被取消时不登记，下次上传重新翻译）"""
+    result = {'output_file': output_path}
+    result.update(stats)
+    
+    result_cache = get_result_cache()
+    if result_cache and cache_key and not stats.get('items_failed') and not job.cancel_event.is_set():
+        result_cache.store(cache_key, job.file_id, result)
+    
+    return result
 
 
 @app.route('/health', methods=['GET'])
@@ -22,100 +152,199 @@ def health():
     return jsonify({'status': 'ok'})
 
 
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """上传文件超过大小上限"""
+    return jsonify({'error': f'文件过大，最大支持 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB'}), 413
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus文本格式的运行指标"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/translate', methods=['POST'])
 def translate_ppt():
     """
-    翻译PPT文件
+    提交PPT翻译任务
     
     请求：
     - file: PPT文件（multipart/form-data）
     
-    返回：
-    - output_file: 翻译后的PPT文件路径
+    返回（202；同一文件已有缓存结果时返回200，任务状态直接为done）：
+    - job_id: 任务ID，通过 /jobs/<job_id> 查询进度
+    - file_id: 输出文件ID，任务完成后可通过 /download/<file_id> 下载
     """
     try:
+        # 读取请求体（上传文件在这一步流式写入磁盘）
+        with stage_timer('upload'):
+            files = request.files
+        
         # 检查文件
-        if 'file' not in request.files:
+        if 'file' not in files:
             return jsonify({'error': '没有上传文件'}), 400
         
-        file = request.files['file']
+        file = files['file']
         if file.filename == '':
             return jsonify({'error': '文件名为空'}), 400
         
         if not file.filename.endswith(('.pptx', '.ppt')):
             return jsonify({'error': '只支持PPT/PPTX文件'}), 400
         
-        # 保存上传的文件
+        # 上传内容已在接收时写入临时文件，这里只需改名（不再复制）
         file_id = str(uuid.uuid4())
         input_path = f'uploads/{file_id}.pptx'
-        file.save(input_path)
+        file.stream.persist(input_path)
         
-        # 处理PPT
-        processor = PPTProcessor(input_path)
-        slides_data = processor.extract_texts()
-        
-        # 翻译（使用DeepSeek API）
-        translator = Translator()
+        # 解析之前先校验ZIP结构，损坏或伪造的文件不进入任务队列
+        error = validate_pptx(input_path)
+        if error:
+            os.remove(input_path)
+            return jsonify({'error': error}), 400
         
-        for slide_data in slides_data:
-            slide_index = slide_data['slide_index']
-            texts = [item['text'] for item in slide_data['texts']]
-            
-            # 获取幻灯片所有文本用于上下文翻译
-            slide_texts = processor.get_slide_texts(slide_index)
-            
-            if slide_texts:
-                # 翻译整个幻灯片（返回字典映射）
-                text_map = translator.translate_slide(slide_texts, slide_index)
-                
-                # 更新PPT中的文本
-                for item in slide_data['texts']:
-                    original_text = item['text']
-                    if original_text in text_map:
-                        translated_text = text_map[original_text]
-                        
-                        if item['text_type'] == 'textbox':
-                            processor.update_text(
-                                slide_index=item['slide_index'],
-                                shape_index=item['shape_index'],
-                                original_text=original_text,
-                                translated_text=translated_text,
-                                paragraph_index=item.get('paragraph_index')
-                            )
-                        elif item['text_type'] == 'group_textbox':
-                            processor.update_text(
-                                slide_index=item['slide_index'],
-                                shape_index=item['shape_index'],
-                                original_text=original_text,
-                                translated_text=translated_text,
-                                paragraph_index=item.get('paragraph_index'),
-                                sub_shape_index=item.get('sub_shape_index')
-                            )
-                        elif item['text_type'] == 'table':
-                            processor.update_text(
-                                slide_index=item['slide_index'],
-                                shape_index=item['shape_index'],
-                                original_text=original_text,
-                                translated_text=translated_text,
-                                row_index=item.get('row_index'),
-                                col_index=item.get('col_index')
-                            )
+        # 相同文件在相同翻译设置下已有结果时，直接返回已完成的任务
+        translator = get_translator()
+        result_cache = get_result_cache()
+        cache_key = None
+        if result_cache:
+            cache_key = result_cache.make_key(file.stream.sha256, translator.settings)
+            entry = result_cache.lookup(cache_key)
+            if entry:
+                os.remove(input_path)
+                # 新任务使用自己的ID（不覆盖之前的任务），输出文件指向缓存的结果
+                job = TranslationJob(file_id, file.filename, file_id=entry['file_id'])
+                job.set_status(TranslationJob.DONE, result=dict(entry['result'], cached=True))
+                return _job_response(job_manager.add(job), file.stream.sha256), 200
         
-        # 保存翻译后的文件
+        # 提交后台任务，立即返回任务ID
         output_path = f'outputs/{file_id}_translated.pptx'
-        processor.save(output_path)
+        job = job_manager.submit(
+            TranslationJob(file_id, file.filename),
+            lambda job: run_translation_job(job, input_path, output_path, translator, cache_key)
+        )
         
-        return jsonify({
-            'success': True,
-            'file_id': file_id,
-            'output_file': output_path,
-            'slides_processed': len(slides_data)
-        })
+        return _job_response(job, file.stream.sha256), 202
     
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _job_response(job: TranslationJob, sha256: str):
+    """提交任务的响应内容"""
+    response = job.to_dict()
+    response.update({
+        'success': True,
+        'sha256': sha256,
+        'status_url': f'/jobs/{job.job_id}',
+        'result_url': f'/jobs/{job.job_id}/result'
+    })
+    return jsonify(response)
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询翻译任务状态和进度"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """下载翻译任务的结果文件"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    if job.status == TranslationJob.FAILED:
+        return jsonify(job.to_dict()), 500
+    
+    if job.status == TranslationJob.CANCELLED:
+        return jsonify(job.to_dict()), 409
+    
+    if job.status != TranslationJob.DONE:
+        # 任务未完成，返回当前进度
+        return jsonify(job.to_dict()), 202
+    
+    return download_file(job.file_id)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """
+    订阅翻译任务事件（Server-Sent Events）
+    
+    连接后先发送一次当前状态，之后推送：
+    - progress: 回填进度 {slides_done, slides_total}
+    - slide: 某张幻灯片的翻译请求完成 {slide_index}（strings=1 时附带 {原文: 译文}）
+    - item: 流式模式（TRANSLATE_STREAMING=1）下单条译文就绪 {slide_index, text, translation}，
+      只在 strings=1 时推送
+    - status: 任务状态变化（完整任务字典）；任务结束（done/failed/cancelled）后关闭连接
+    
+    默认只推送连接之后的事件；断线重连时浏览器携带 Last-Event-ID 从断点继续，
+    也可以用 after=0 重放保留的全部事件。
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    include_strings = request.args.get('strings') == '1'
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('after')
+    last_id = int(last_id) if last_id and last_id.isdigit() else job.last_event_id
+    
+    def generate(last_id: int):
+        yield _sse_message('status', job.to_dict())
+        while True:
+            events = job.events_after(last_id, timeout=SSE_KEEPALIVE)
+            for event in events:
+                last_id = event['id']
+                data = event['data']
+                if event['event'] == 'item' and not include_strings:
+                    continue
+                if event['event'] == 'slide' and not include_strings:
+                    data = {'slide_index': data['slide_index']}
+                yield _sse_message(event['event'], data, event['id'])
+            
+            if job.finished and last_id >= job.last_event_id:
+                break
+            if not events:
+                yield ': keep-alive\n\n'
+    
+    return Response(stream_with_context(generate(last_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def _sse_message(event: str, data: dict, event_id: int = None) -> str:
+    """格式化一条SSE消息"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    取消翻译任务
+    
+    排队中的任务立即取消；执行中的任务不再发送剩余请求，
+    已在途的请求结束后状态变为cancelled（不生成输出文件）。
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    if not job.cancel():
+        return jsonify(job.to_dict()), 409
+    
+    return jsonify(job.to_dict()), 202
+
+
 @app.route('/download/<file_id>', methods=['GET'])
 def download_file(file_id):
     """下载翻译后的文件"""
@@ -131,5 +360,9 @@ def download_file(file_id):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5014)
+    # 开发服务器（单进程）；生产环境使用 gunicorn -c gunicorn.conf.py app:app
+    app.run(debug=os.getenv('FLASK_DEBUG', '0') == '1',
+            host=os.getenv('HOST', '0.0.0.0'),
+            port=int(os.getenv('PORT', '5014')),
+            threaded=True)
 
@@ -0,0 +1,96 @@
+"""
+批量规划模块 - 按token预算把多张幻灯片的文本打包成一次翻译请求
+文本少的幻灯片合并发送，文本多的幻灯片拆分到多个请求
+"""
+import os
+import math
+from typing import List, Tuple
+
+
+# 单个请求中待翻译文本的token预算（不含系统提示词和规则）
+DEFAULT_TOKEN_BUDGET = int(os.getenv('TRANSLATE_BATCH_TOKEN_BUDGET', '1500'))
+# 单个请求的最大文本条数，条数过多时模型容易漏行
+DEFAULT_MAX_ITEMS = int(os.getenv('TRANSLATE_BATCH_MAX_ITEMS', '60'))
+# 每条文本的编号、换行等额外开销
+ITEM_OVERHEAD_TOKENS = 4
+
+# 一个幻灯片分段：(幻灯片索引, 文本列表)
+Section = Tuple[int, List[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数
+
+    中文字符和全角标点按每字1个token计，其他字符按每4个字符1个token计。
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数
+    """
+    cjk = sum(1 for char in text
+              if '\u4e00' <= char <= '\u9fff' or '\u3000' <= char <= '\u303f'
+              or '\uff00' <= char <= '\uffef')
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def plan_batches(sections: List[Section], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 max_items: int = DEFAULT_MAX_ITEMS) -> List[List[Section]]:
+    """
+    规划批量请求
+
+    按幻灯片顺序贪心打包：当前请求放不下下一张幻灯片时开始新请求；
+    单张幻灯片超过预算时按文本拆分到多个请求（同一幻灯片的分段保持相邻）。
+    单条文本超过预算时单独成为一个请求。
+
+    Args:
+        sections: 幻灯片分段列表 [(幻灯片索引, 文本列表)]，按幻灯片顺序排列
+        token_budget: 每个请求的token预算
+        max_items: 每个请求的最大文本条数
+
+    Returns:
+        请求列表，每个请求是若干幻灯片分段
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    current_items = 0
+
+    def flush():
+        nonlocal current, current_tokens, current_items
+        if current:
+            batches.append(current)
+        current = []
+        current_tokens = 0
+        current_items = 0
+
+    for slide_index, texts in sections:
+        if not texts:
+            continue
+
+        costs = [estimate_tokens(text) + ITEM_OVERHEAD_TOKENS for text in texts]
+        slide_tokens = sum(costs)
+
+        # 整张幻灯片放不进当前请求时，先结束当前请求
+        if current and (current_tokens + slide_tokens > token_budget
+                        or current_items + len(texts) > max_items):
+            flush()
+
+        chunk = []
+        for text, cost in zip(texts, costs):
+            if chunk and (current_tokens + cost > token_budget or current_items + 1 > max_items):
+                # 超大幻灯片：当前分段已满，拆到下一个请求
+                current.append((slide_index, chunk))
+                flush()
+                chunk = []
+            chunk.append(text)
+            current_tokens += cost
+            current_items += 1
+
+        if chunk:
+            current.append((slide_index, chunk))
+
+    flush()
+    return batches
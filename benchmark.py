@@ -0,0 +1,303 @@
+"""
+端到端基准测试
+生成合成PPT，分阶段计时（加载、提取、翻译、回填、保存），
+翻译使用本地mock后端，报告幻灯片吞吐量、峰值内存，并与基线JSON比较。
+所有运行在一个全新的子进程中进行，峰值内存不包含生成合成PPT和父进程已占用的内存
+
+使用方法:
+    python3 benchmark.py --slides 100
+    python3 benchmark.py --slides 100 --save-baseline
+    python3 benchmark.py --deck your_file.pptx --latency-ms 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from ppt_processor import PPTProcessor, ENGINES
+from translator import Translator
+from translation_memory import TranslationMemory
+from translation_backends import MockBackend
+from request_scheduler import RequestScheduler
+from translation_pipeline import plan_deck_requests, DEFAULT_MAX_IN_FLIGHT
+from batch_planner import plan_batches, DEFAULT_TOKEN_BUDGET
+from synthetic_deck import generate_deck
+
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+STAGES = ['load', 'extract', 'translate', 'write_back', 'save']
+# 峰值内存的统计范围：run表示只包含测量子进程（导入模块和各次运行），旧基线没有该字段，不比较内存
+PEAK_RSS_SCOPE = 'run'
+
+
+def peak_rss_mb() -> float:
+    """
+    获取当前进程的峰值常驻内存（MB）
+
+    Linux上读取 /proc/self/status 的 VmHWM：ru_maxrss 在exec之后仍保留父进程的峰值，
+    子进程里读到的可能是父进程（生成PPT时）的内存
+
+    Returns:
+        峰值RSS（MB）
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS单位为字节
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_once(deck_path: str, latency_ms: float, max_in_flight: int,
+             token_budget: int, engine: str = 'python') -> Dict:
+    """
+    运行一次完整流程并记录各阶段耗时
+
+    Args:
+        deck_path: PPT文件路径
+        latency_ms: mock后端每次请求的延迟（毫秒）
+        max_in_flight: 同时在途的请求上限
+        token_budget: 每个请求的token预算
+        engine: 文本提取引擎（python或xml）
+
+    Returns:
+        包含各阶段耗时、幻灯片数、请求数的字典
+    """
+    timings = {}
+
+    @contextmanager
+    def stage(name: str):
+        start = time.perf_counter()
+        yield
+        timings[name] = time.perf_counter() - start
+
+    # 每次使用全新的内存缓存，保证测的是冷启动的翻译路径
+    translator = Translator(memory=TranslationMemory(':memory:'),
+                            scheduler=RequestScheduler(),
+                            backend=MockBackend(latency_ms=latency_ms))
+
+    with stage('load'):
+        processor = PPTProcessor(deck_path, engine=engine)
+
+    with stage('extract'):
+        slides_data = processor.extract_texts()
+
+    with stage('translate'):
+        requests, dedup_stats = plan_deck_requests(processor, slides_data)
+        batches = plan_batches(requests, token_budget)
+        deck_map = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+            for result in executor.map(translator.translate_batch, batches):
+                for slide_map in result.values():
+                    deck_map.update(slide_map)
+
+    with stage('write_back'):
+        units = 0
+        for slide_index, _ in requests:
+            units += processor.apply_slide_translations(slide_index, deck_map)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with stage('save'):
+            processor.save(os.path.join(tmp_dir, 'output.pptx'))
+
+    return {
+        'stages': timings,
+        'slides': len(processor.prs.slides),
+        'units': units,
+        'requests': len(batches),
+        'dedup_ratio': dedup_stats['dedup_ratio']
+    }
+
+
+def _measure(params: Dict):
+    """子进程：按参数运行若干次，输出各次结果、导入模块后的基线内存和峰值内存（JSON）"""
+    baseline = peak_rss_mb()
+    runs = [run_once(params['deck_path'], params['latency_ms'], params['max_in_flight'],
+                     params['token_budget'], params['engine'])
+            for _ in range(max(1, params['repeat']))]
+    print(json.dumps({'runs': runs, 'baseline_rss_mb': baseline, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def _run_child(params: Dict) -> Dict:
+    """在全新的子进程中运行测量，避免生成PPT等父进程已占用的内存计入峰值"""
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', json.dumps(params)],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(deck_path: str, repeat: int = 3, latency_ms: float = 0,
+                  max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                  token_budget: int = DEFAULT_TOKEN_BUDGET, engine: str = 'python') -> Dict:
+    """
+    在子进程中多次运行，取每个阶段的最小耗时
+
+    Args:
+        deck_path: PPT文件路径
+        repeat: 运行次数
+        latency_ms: mock后端每次请求的延迟（毫秒）
+        max_in_flight: 同时在途的请求上限
+        token_budget: 每个请求的token预算
+        engine: 文本提取引擎（python或xml）
+
+    Returns:
+        基准测试结果字典
+    """
+    measured = _run_child({'deck_path': os.path.abspath(deck_path), 'repeat': repeat,
+                           'latency_ms': latency_ms, 'max_in_flight': max_in_flight,
+                           'token_budget': token_budget, 'engine': engine})
+    runs = measured['runs']
+
+    stages = {name: min(run['stages'][name] for run in runs) for name in STAGES}
+    total = sum(stages.values())
+    first = runs[0]
+
+    return {
+        'config': {
+            'deck': os.path.basename(deck_path),
+            'repeat': repeat,
+            'latency_ms': latency_ms,
+            'max_in_flight': max_in_flight,
+            'token_budget': token_budget,
+            'engine': engine
+        },
+        'slides': first['slides'],
+        'units': first['units'],
+        'requests': first['requests'],
+        'dedup_ratio': first['dedup_ratio'],
+        'stages': stages,
+        'total': total,
+        'slides_per_sec': first['slides'] / total if total else 0.0,
+        'baseline_rss_mb': measured['baseline_rss_mb'],
+        'peak_rss_mb': measured['peak_rss_mb'],
+        'peak_rss_scope': PEAK_RSS_SCOPE
+    }
+
+
+def compare_with_baseline(result: Dict, baseline: Dict, tolerance: float,
+                          min_delta: float = 0.01) -> List[str]:
+    """
+    与基线比较，找出变慢的阶段
+
+    Args:
+        result: 本次结果
+        baseline: 基线结果
+        tolerance: 允许的相对变慢比例（0.2表示20%）
+        min_delta: 忽略小于该秒数的差异（计时噪声）
+
+    Returns:
+        回归描述列表，为空表示没有回归
+    """
+    regressions = []
+
+    for name in STAGES + ['total']:
+        current = result['stages'][name] if name in STAGES else result['total']
+        base = baseline['stages'].get(name) if name in STAGES else baseline.get('total')
+        if base is None:
+            continue
+        if current > base * (1 + tolerance) and current - base > min_delta:
+            regressions.append(f"{name}: {base:.3f}s -> {current:.3f}s (+{(current / base - 1) * 100:.0f}%)")
+
+    # 旧基线的峰值内存包含生成合成PPT，统计范围不同时不比较
+    base_rss = baseline.get('peak_rss_mb') if baseline.get('peak_rss_scope') == PEAK_RSS_SCOPE else None
+    if base_rss and result['peak_rss_mb'] > base_rss * (1 + tolerance):
+        regressions.append(f"peak_rss: {base_rss:.1f}MB -> {result['peak_rss_mb']:.1f}MB")
+
+    return regressions
+
+
+def print_report(result: Dict, baseline: Optional[Dict] = None):
+    """打印基准测试报告"""
+    print("=" * 60)
+    print(f"基准测试: {result['config']['deck']}")
+    print(f"  幻灯片: {result['slides']}  文本单元: {result['units']}  "
+          f"请求数: {result['requests']}  去重比例: {result['dedup_ratio']:.1%}")
+    print("=" * 60)
+    for name in STAGES:
+        line = f"  {name:<12}{result['stages'][name]:>10.3f}s"
+        if baseline and name in baseline.get('stages', {}):
+            line += f"    (基线 {baseline['stages'][name]:.3f}s)"
+        print(line)
+    print(f"  {'total':<12}{result['total']:>10.3f}s")
+    print(f"\n  吞吐量: {result['slides_per_sec']:.1f} 张幻灯片/秒")
+    print(f"  峰值内存: {result['peak_rss_mb']:.1f} MB（导入模块后 {result['baseline_rss_mb']:.1f} MB）")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="PPT翻译流水线端到端基准测试")
+    parser.add_argument('--deck', help="使用已有的PPT文件（不指定则生成合成PPT）")
+    parser.add_argument('--slides', type=int, default=100)
+    parser.add_argument('--textboxes', type=int, default=3)
+    parser.add_argument('--groups', type=int, default=1)
+    parser.add_argument('--tables', type=int, default=1)
+    parser.add_argument('--charts', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=0, help="mock后端每次请求的延迟")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument('--engine', choices=ENGINES, default='python', help="文本提取引擎")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线JSON文件路径")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的相对变慢比例")
+    parser.add_argument('--json', action='store_true', help="以JSON输出结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deck_path = args.deck
+        if not deck_path:
+            deck_path = os.path.join(tmp_dir, f'synthetic_{args.slides}.pptx')
+            generate_deck(deck_path, args.slides, args.textboxes, args.groups,
+                          args.tables, args.charts)
+
+        result = run_benchmark(deck_path, args.repeat, args.latency_ms,
+                               args.max_in_flight, args.token_budget, args.engine)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_report(result, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 基线已保存: {args.baseline}")
+        return 0
+
+    if baseline:
+        if baseline.get('config') != result['config']:
+            print("\n⚠️  基线配置与本次不同，比较结果仅供参考")
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ 性能回归:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✅ 未发现性能回归")
+
+    return 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--measure':
+        _measure(json.loads(sys.argv[2]))
+    else:
+        sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+文本分类微基准测试
+比较旧版 _should_translate（每次调用多次正则扫描）与 TextClassifier（预编译、带缓存）的耗时，
+并列出两者判断结果不同的文本
+
+使用方法:
+    python3 benchmark_classifier.py --slides 100
+    python3 benchmark_classifier.py --deck your_file.pptx --passes 2
+
+参考结果（合成PPT 100页，--repeat 40）：无缓存约 1.4-1.5x，带缓存约 3.2x；
+机器负载波动较大时加大 --repeat 再比较
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+from typing import Callable, List
+
+from xml_extractor import XMLExtractor
+from text_classifier import TextClassifier, classifier_from_env
+from synthetic_deck import generate_deck
+
+
+# 低中文比例、标点、单位、基因名等边界情况
+EXTRA_SAMPLES = [
+    '2024', '3.5%', 'mNGS', 'EGFR、KRAS、ALK', 'Revenue growth in 2024年',
+    'Series A 轮次', 'Total cost of ownership, 成本', 'Cohort A | Cohort B 样本 comparison',
+    'PCR检测', '宏基因组测序（mNGS）', 'Q3: 120 samples processed in 48 小时',
+]
+
+
+def legacy_should_translate(text: str) -> bool:
+    """旧版实现（重构前的 PPTProcessor._should_translate），仅用于对比"""
+    if text.isdigit():
+        return False
+
+    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
+    if chinese_chars == 0:
+        return False
+
+    total_chars = len(text)
+    if total_chars > 0:
+        chinese_ratio = chinese_chars / total_chars
+        if chinese_ratio < 0.2:
+            has_chinese_punctuation = bool(re.search(r'[：，。、；]', text))
+            has_time_unit = bool(re.search(r'[小时|分钟|秒|天|年|月]', text))
+            has_chinese_keywords = bool(re.search(r'[轮次|金额|融资|投资|成本|价格|数量]', text))
+            if has_chinese_punctuation or has_time_unit or has_chinese_keywords:
+                return True
+            return False
+
+    return True
+
+
+def collect_texts(deck_path: str) -> List[str]:
+    """
+    提取PPT中所有候选文本（不做过滤），按出现顺序
+
+    Args:
+        deck_path: PPT文件路径
+
+    Returns:
+        文本列表（含重复）
+    """
+    texts = []
+    for slide in XMLExtractor(deck_path, lambda text: True, workers=1).extract():
+        texts.extend(item['text'] for item in slide['texts'])
+    return texts
+
+
+def time_calls(func: Callable[[str], bool], texts: List[str], passes: int) -> float:
+    """
+    对全部文本调用若干遍，返回总耗时（毫秒）
+
+    Args:
+        func: 判断函数
+        texts: 文本列表
+        passes: 遍数（提取和上下文构建会对同一文本多次判断）
+
+    Returns:
+        总耗时（毫秒）
+    """
+    start = time.perf_counter()
+    for _ in range(passes):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文本分类微基准测试")
+    parser.add_argument('--deck', help="使用已有的PPT文件（不指定则生成合成PPT）")
+    parser.add_argument('--slides', type=int, default=100)
+    parser.add_argument('--passes', type=int, default=2, help="每个文本的判断次数")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deck_path = args.deck
+        if not deck_path:
+            deck_path = os.path.join(tmp_dir, f'synthetic_{args.slides}.pptx')
+            generate_deck(deck_path, args.slides)
+        texts = collect_texts(deck_path) + EXTRA_SAMPLES
+
+    env_classifier = classifier_from_env()
+    variants = [
+        ('旧版（逐次正则）', lambda: legacy_should_translate),
+        ('分类器（无缓存）', lambda: TextClassifier(cache_size=0).should_translate),
+        ('分类器（带缓存）', lambda: TextClassifier().should_translate),
+    ]
+
+    print(f"文本数: {len(texts)}（不同文本 {len(set(texts))}），每个文本判断 {args.passes} 次，"
+          f"取 {args.repeat} 次最优")
+    timings = {}
+    for name, factory in variants:
+        # 每次重复都新建分类器，缓存从空开始
+        timings[name] = min(time_calls(factory(), texts, args.passes)
+                            for _ in range(args.repeat))
+
+    baseline = timings[variants[0][0]]
+    for name, elapsed in timings.items():
+        print(f"  {name:<12} {elapsed:8.2f} ms   {baseline / elapsed:5.1f}x")
+
+    differences = sorted({text for text in texts
+                          if legacy_should_translate(text) != env_classifier.classify(text)})
+    if differences:
+        print("\n判断结果与旧版不同的文本（旧版 -> 当前配置）:")
+        for text in differences:
+            print(f"  {text!r}: {legacy_should_translate(text)} -> {env_classifier.classify(text)}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+gunicorn配置 - 生产环境入口
+每个工作进程有自己的任务线程池，任务状态通过 JOB_STATE_DIR 中的快照在进程之间共享
+
+使用方法:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+import time
+import signal
+import threading
+import multiprocessing
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5014')}"
+
+# 工作进程数，0表示CPU核数（提取、回填等CPU密集的工作按核数扩展）
+workers = int(os.getenv('WEB_WORKERS', '0')) or multiprocessing.cpu_count()
+# 每个进程的请求线程数（SSE事件流、轮询、上传各占一个线程）
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '8'))
+
+# 工作进程无响应的超时（秒）；gthread由主线程发送心跳，长连接的SSE不受影响
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+# 收到SIGTERM后等待执行中的请求和任务结束的时间（秒），超时后强制结束进程
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', '300'))
+keepalive = 5
+# 平滑关闭时为取消未完成任务、写入cancelled状态预留的时间（秒），从 graceful_timeout 中扣除
+drain_margin = min(10, graceful_timeout / 2)
+
+# 不在主进程中预加载应用：任务线程池、SQLite连接等在每个工作进程中创建
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+# 本工作进程的任务平滑关闭（线程和截止时间），收到停止信号时创建
+_drain = {}
+
+
+def _start_drain(worker, timeout: float):
+    """
+    在后台线程中平滑关闭本进程的任务管理器（只启动一次）
+
+    仲裁进程在发送SIGTERM时就开始计算 graceful_timeout，超时后强制结束工作进程，
+    因此从收到信号起计时，等待 timeout 秒后取消未完成的任务，剩余时间用于记录cancelled状态
+
+    Args:
+        worker: gunicorn工作进程
+        timeout: 等待任务完成的最长时间（秒）
+    """
+    if 'thread' in _drain:
+        return
+    from app import job_manager
+
+    def run():
+        cancelled = job_manager.drain(timeout)
+        if cancelled:
+            worker.log.warning("工作进程 %s 关闭时取消了 %s 个未完成的任务", worker.pid, cancelled)
+
+    _drain['deadline'] = time.time() + worker.cfg.graceful_timeout
+    _drain['thread'] = threading.Thread(target=run, name='job-drain', daemon=True)
+    _drain['thread'].start()
+
+
+def post_worker_init(worker):
+    """工作进程开始接收请求之前预热，并在收到SIGTERM时立即开始平滑关闭任务"""
+    from app import warm_up
+
+    warm_up()
+
+    # gunicorn的SIGTERM处理只停止接收请求；worker_exit要等进行中的请求（如SSE事件流）结束才调用，
+    # 那时可能已接近强制结束的时间，因此在信号处理中就开始等待任务
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(sig, frame):
+        _start_drain(worker, max(0, worker.cfg.graceful_timeout - drain_margin))
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+    signal.siginterrupt(signal.SIGTERM, False)
+    worker.log.info("工作进程 %s 预热完成", worker.pid)
+
+
+def worker_int(worker):
+    """快速关闭（SIGINT/SIGQUIT）：立即取消本进程的任务并记录cancelled状态"""
+    _start_drain(worker, 0)
+
+
+def worker_exit(server, worker):
+    """工作进程退出前等待平滑关闭完成（没有收到停止信号时在这里开始），最长到强制结束的时间"""
+    _start_drain(worker, max(0, server.cfg.graceful_timeout - drain_margin))
+    _drain['thread'].join(max(0, _drain['deadline'] - time.time()))
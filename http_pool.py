@@ -0,0 +1,128 @@
+"""
+HTTP连接池模块 - 进程内共享的httpx客户端
+所有翻译请求复用同一个连接池（keep-alive），新任务不再重新建立TCP/TLS连接；
+安装了h2时使用HTTP/2，并发请求在同一连接上多路复用
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from metrics import REGISTRY, HTTP_REQUESTS, HTTP_CONNECTIONS_OPENED
+
+
+# 连接池上限：同时打开的连接数、空闲时保留的连接数
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '32'))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', '16'))
+# 空闲连接保留时间（秒）
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '60'))
+# 1表示在安装了h2时使用HTTP/2
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', '1') == '1'
+
+
+def http2_available() -> bool:
+    """
+    判断是否可以使用HTTP/2（需要 pip install httpx[http2]）
+
+    Returns:
+        True表示已安装h2
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _trace(event_name: str, info: Dict):
+    """httpcore的trace回调：统计新建的TCP连接和TLS握手"""
+    if event_name == 'connection.connect_tcp.complete':
+        HTTP_CONNECTIONS_OPENED.inc(stage='tcp')
+    elif event_name == 'connection.start_tls.complete':
+        HTTP_CONNECTIONS_OPENED.inc(stage='tls')
+
+
+def _on_request(request: httpx.Request):
+    HTTP_REQUESTS.inc()
+    request.extensions['trace'] = _trace
+
+
+def create_http_client(max_connections: int = HTTP_MAX_CONNECTIONS,
+                       max_keepalive: int = HTTP_MAX_KEEPALIVE,
+                       keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                       http2: Optional[bool] = None) -> httpx.Client:
+    """
+    创建带连接池的httpx客户端
+
+    Args:
+        max_connections: 同时打开的连接数上限
+        max_keepalive: 空闲时保留的连接数上限
+        keepalive_expiry: 空闲连接保留时间（秒）
+        http2: 是否使用HTTP/2，默认在 HTTP2_ENABLED=1 且安装了h2时使用
+
+    Returns:
+        httpx客户端（超时由每次请求指定）
+    """
+    if http2 is None:
+        http2 = HTTP2_ENABLED and http2_available()
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_keepalive,
+                          keepalive_expiry=keepalive_expiry)
+    return httpx.Client(limits=limits, http2=http2, event_hooks={'request': [_on_request]})
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    获取进程内共享的httpx客户端（按环境变量配置连接池）
+
+    Returns:
+        httpx客户端
+    """
+    global _default_client
+
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = create_http_client()
+    return _default_client
+
+
+def pool_stats(client: Optional[httpx.Client] = None) -> Dict:
+    """
+    获取连接池状态
+
+    httpx没有公开连接池状态，这里读取默认传输层的httpcore连接池，读取失败时返回0。
+
+    Args:
+        client: httpx客户端，默认为共享客户端（尚未创建时全部为0）
+
+    Returns:
+        统计字典：connections（已打开）、idle（空闲可复用）、max_connections、http2
+    """
+    client = client or _default_client
+    stats = {'connections': 0, 'idle': 0, 'max_connections': HTTP_MAX_CONNECTIONS, 'http2': False}
+    if client is None:
+        return stats
+
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    connections = list(getattr(pool, 'connections', []))
+    stats['connections'] = len(connections)
+    stats['idle'] = sum(1 for connection in connections if connection.is_idle())
+    stats['max_connections'] = getattr(pool, '_max_connections', HTTP_MAX_CONNECTIONS)
+    stats['http2'] = bool(getattr(pool, '_http2', False))
+    return stats
+
+
+REGISTRY.gauge('ppt_translator_http_pool_connections', '共享连接池中已打开的连接数',
+               lambda: pool_stats()['connections'])
+REGISTRY.gauge('ppt_translator_http_pool_idle_connections', '共享连接池中空闲可复用的连接数',
+               lambda: pool_stats()['idle'])
+REGISTRY.gauge('ppt_translator_http_pool_max_connections', '共享连接池的连接数上限',
+               lambda: pool_stats()['max_connections'])
+REGISTRY.gauge('ppt_translator_http2_enabled', '共享连接池是否使用HTTP/2（1表示是）',
+               lambda: int(pool_stats()['http2']))
@@ -0,0 +1,578 @@
+"""
+任务管理模块 - 在后台工作线程中执行翻译任务
+提交后立即返回任务ID，客户端通过任务ID查询进度和结果，或订阅任务事件（SSE）
+多进程部署时任务状态写入共享目录的快照，任一工作进程都能查询、订阅和取消任务
+"""
+import os
+import re
+import json
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+# 同时执行的翻译任务数
+DEFAULT_JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# 已结束任务在任务表中保留的时间（秒）
+JOB_RETENTION = int(os.getenv('JOB_RETENTION', str(24 * 3600)))
+# 每个任务保留的最近事件数（晚连接的客户端先收到当前状态，再从保留的事件继续）
+MAX_JOB_EVENTS = 2000
+# 任务状态快照目录（同一部署的工作进程共享），为空表示不保存快照
+JOB_STATE_DIR = os.getenv('JOB_STATE_DIR', 'cache/jobs')
+# 进度快照的最短写入间隔（秒），状态变化总是立即写入
+SNAPSHOT_INTERVAL = 1.0
+# 读取其他进程中任务的快照、检查取消请求的间隔（秒）
+REMOTE_POLL_INTERVAL = 1.0
+
+_JOB_ID = re.compile(r'^[A-Za-z0-9-]+$')
+
+
+class JobStore:
+    """任务状态存储类 - 每个任务一个JSON快照，以及跨进程的取消标记"""
+
+    def __init__(self, directory: str = JOB_STATE_DIR):
+        """
+        初始化任务状态存储
+
+        Args:
+            directory: 快照目录
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str, suffix: str = '.json') -> Optional[str]:
+        """快照文件路径，任务ID不合法时返回None（ID来自URL）"""
+        if not _JOB_ID.match(job_id):
+            return None
+        return os.path.join(self.directory, job_id + suffix)
+
+    def save(self, snapshot: Dict):
+        """
+        写入任务快照（先写临时文件再替换，读取方不会读到半个文件）
+
+        Args:
+            snapshot: 任务状态字典
+        """
+        path = self._path(snapshot['job_id'])
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """
+        读取任务快照
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态字典，不存在时返回None
+        """
+        path = self._path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def request_cancel(self, job_id: str):
+        """
+        登记取消请求，由执行任务的进程检查
+
+        Args:
+            job_id: 任务ID
+        """
+        path = self._path(job_id, '.cancel')
+        if path:
+            open(path, 'a').close()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """
+        检查任务是否有取消请求
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            True表示其他进程请求取消该任务
+        """
+        path = self._path(job_id, '.cancel')
+        return path is not None and os.path.exists(path)
+
+    def prune(self, cutoff: float):
+        """
+        删除最后修改时间早于cutoff的快照和取消标记
+
+        Args:
+            cutoff: 时间戳
+        """
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+def job_store_from_env() -> Optional[JobStore]:
+    """
+    按 JOB_STATE_DIR 创建任务状态存储
+
+    Returns:
+        任务状态存储，JOB_STATE_DIR为空时返回None
+    """
+    return JobStore(JOB_STATE_DIR) if JOB_STATE_DIR else None
+
+
+class TranslationJob:
+    """翻译任务类 - 记录单个任务的状态和进度"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, job_id: str, filename: str = '', file_id: Optional[str] = None):
+        """
+        初始化翻译任务
+
+        Args:
+            job_id: 任务ID
+            filename: 上传的原始文件名
+            file_id: 输出文件ID，默认与任务ID相同（命中结果缓存的任务指向已有的输出文件）
+        """
+        self.job_id = job_id
+        self.file_id = file_id or job_id
+        self.filename = filename
+        self.status = self.QUEUED
+        self.slides_done = 0
+        self.slides_total = 0
+        self.result = {}
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # 设置后翻译流水线尽快停止（取消尚未发送的请求）
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        # 事件日志：[{'id', 'event', 'data'}]，新事件通知等待中的订阅者
+        self._events = []
+        self._next_event_id = 1
+        self._changed = threading.Condition(self._lock)
+        # 状态快照（由任务管理器在登记任务时设置）
+        self._store = None
+        self._persisted_at = 0.0
+
+    def attach_store(self, store: JobStore):
+        """
+        设置状态快照存储并立即写入一次
+
+        Args:
+            store: 任务状态存储
+        """
+        with self._lock:
+            self._store = store
+            self._persist_locked(force=True)
+
+    def _persist_locked(self, force: bool = False):
+        """写入状态快照（调用方持有锁），进度更新按最短间隔合并"""
+        if self._store is None:
+            return
+        now = time.time()
+        if not force and now - self._persisted_at < SNAPSHOT_INTERVAL:
+            return
+        snapshot = self._to_dict_locked()
+        snapshot['last_event_id'] = self._next_event_id - 1
+        try:
+            self._store.save(snapshot)
+            self._persisted_at = now
+        except OSError as e:
+            print(f"⚠️  任务 {self.job_id} 状态快照写入失败: {e}")
+
+    def _add_event(self, event: str, data: Dict):
+        """追加事件并唤醒订阅者（调用方持有锁）"""
+        self._events.append({'id': self._next_event_id, 'event': event, 'data': data})
+        self._next_event_id += 1
+        if len(self._events) > MAX_JOB_EVENTS:
+            del self._events[:len(self._events) - MAX_JOB_EVENTS]
+        self._changed.notify_all()
+
+    def set_progress(self, slides_done: int, slides_total: int):
+        """
+        更新进度
+
+        Args:
+            slides_done: 已完成的幻灯片数
+            slides_total: 幻灯片总数
+        """
+        with self._lock:
+            self.slides_done = slides_done
+            self.slides_total = slides_total
+            self.updated_at = time.time()
+            self._add_event('progress', {'slides_done': slides_done, 'slides_total': slides_total})
+            self._persist_locked()
+
+    def add_translations(self, slide_maps: Dict[int, Dict[str, str]]):
+        """
+        记录一个翻译请求完成（可在请求线程中调用）
+
+        Args:
+            slide_maps: {幻灯片索引: {原文: 译文}}
+        """
+        with self._lock:
+            for slide_index, strings in sorted(slide_maps.items()):
+                self._add_event('slide', {'slide_index': slide_index, 'strings': dict(strings)})
+
+    def add_item(self, slide_index: int, text: str, translated_text: str):
+        """
+        记录一条译文就绪（流式模式下逐条到达，可在请求线程中调用）
+
+        Args:
+            slide_index: 幻灯片索引
+            text: 原文
+            translated_text: 译文
+        """
+        with self._lock:
+            self._add_event('item', {'slide_index': slide_index, 'text': text,
+                                     'translation': translated_text})
+
+    @property
+    def last_event_id(self) -> int:
+        """最新事件的编号（还没有事件时为0）"""
+        with self._lock:
+            return self._next_event_id - 1
+
+    def events_after(self, last_id: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        获取编号大于last_id的事件，没有新事件时最多等待timeout秒
+
+        Args:
+            last_id: 客户端已收到的最后一个事件编号
+            timeout: 等待秒数，None表示不等待
+
+        Returns:
+            事件列表（可能为空）
+        """
+        with self._lock:
+            if timeout and self._next_event_id - 1 <= last_id and not self.finished:
+                self._changed.wait(timeout)
+            return [event for event in self._events if event['id'] > last_id]
+
+    def cancel(self) -> bool:
+        """
+        请求取消任务：排队中的任务直接取消，执行中的任务在下一个检查点停止
+
+        Returns:
+            False表示任务已结束，无法取消
+        """
+        with self._lock:
+            if self.finished:
+                return False
+            self.cancel_event.set()
+            if self.status == self.QUEUED:
+                self._set_status_locked(self.CANCELLED, None, None)
+            return True
+
+    def set_status(self, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        """
+        更新任务状态
+
+        Args:
+            status: 新状态
+            result: 任务结果（完成时）
+            error: 错误信息（失败时）
+        """
+        with self._lock:
+            self._set_status_locked(status, result, error)
+
+    def _set_status_locked(self, status: str, result: Optional[Dict], error: Optional[str]):
+        """更新任务状态并记录事件（调用方持有锁）"""
+        self.status = status
+        if result is not None:
+            self.result = result
+        if error is not None:
+            self.error = error
+        self.updated_at = time.time()
+        self._add_event('status', self._to_dict_locked())
+        self._persist_locked(force=True)
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束（成功、失败或取消）"""
+        return self.status in (self.DONE, self.FAILED, self.CANCELLED)
+
+    def to_dict(self) -> Dict:
+        """
+        转换为可JSON序列化的字典
+
+        Returns:
+            任务状态字典
+        """
+        with self._lock:
+            return self._to_dict_locked()
+
+    def _to_dict_locked(self) -> Dict:
+        """任务状态字典（调用方持有锁）"""
+        return {
+            'job_id': self.job_id,
+            'file_id': self.file_id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': {
+                'slides_done': self.slides_done,
+                'slides_total': self.slides_total
+            },
+            'result': dict(self.result),
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class RemoteJob(TranslationJob):
+    """在其他工作进程中执行的任务 - 只读视图，状态和事件来自快照"""
+
+    def __init__(self, store: JobStore, snapshot: Dict):
+        """
+        初始化任务视图
+
+        Args:
+            store: 任务状态存储
+            snapshot: 任务快照
+        """
+        super().__init__(snapshot['job_id'], snapshot.get('filename', ''), snapshot.get('file_id'))
+        self._remote_store = store
+        self._remote_event_id = 0
+        self._apply_snapshot(snapshot)
+
+    def _apply_snapshot(self, snapshot: Dict):
+        """用快照更新状态（调用方持有锁或对象尚未共享）"""
+        progress = snapshot.get('progress', {})
+        self.status = snapshot['status']
+        self.slides_done = progress.get('slides_done', 0)
+        self.slides_total = progress.get('slides_total', 0)
+        self.result = snapshot.get('result') or {}
+        self.error = snapshot.get('error')
+        self.created_at = snapshot.get('created_at', self.created_at)
+        self.updated_at = snapshot.get('updated_at', self.updated_at)
+        self._remote_event_id = snapshot.get('last_event_id', 0)
+
+    @property
+    def last_event_id(self) -> int:
+        """快照中最新事件的编号"""
+        with self._lock:
+            return self._remote_event_id
+
+    def events_after(self, last_id: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        轮询快照，状态或进度有变化时返回对应的事件
+
+        只能还原 progress 和 status 事件，slide/item 事件只在执行任务的进程中推送。
+
+        Args:
+            last_id: 客户端已收到的最后一个事件编号
+            timeout: 等待秒数，None表示不等待
+
+        Returns:
+            事件列表（可能为空）
+        """
+        deadline = time.time() + (timeout or 0)
+        while True:
+            snapshot = self._remote_store.load(self.job_id)
+            with self._lock:
+                if snapshot is None:
+                    return []
+                previous = (self.status, self.slides_done, self.slides_total)
+                self._apply_snapshot(snapshot)
+                event_id = self._remote_event_id
+                events = []
+                if event_id > last_id:
+                    if (self.slides_done, self.slides_total) != previous[1:]:
+                        events.append({'id': event_id, 'event': 'progress',
+                                       'data': {'slides_done': self.slides_done,
+                                                'slides_total': self.slides_total}})
+                    if self.status != previous[0] or self.finished:
+                        events.append({'id': event_id, 'event': 'status',
+                                       'data': self._to_dict_locked()})
+                if events or self.finished:
+                    return events
+            if time.time() >= deadline:
+                return []
+            time.sleep(REMOTE_POLL_INTERVAL)
+
+    def cancel(self) -> bool:
+        """
+        请求执行任务的进程取消任务
+
+        Returns:
+            False表示任务已结束，无法取消
+        """
+        with self._lock:
+            if self.finished:
+                return False
+        self._remote_store.request_cancel(self.job_id)
+        return True
+
+
+class JobManager:
+    """任务管理器类 - 维护任务表和工作线程池"""
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS, store: Optional[JobStore] = None):
+        """
+        初始化任务管理器
+
+        Args:
+            max_workers: 工作线程数
+            store: 任务状态存储，提供时写入任务快照，并能查询其他进程中的任务
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                            thread_name_prefix='translate-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.store = store
+        self._closing = threading.Event()
+        if store is not None:
+            # 其他进程收到的取消请求通过取消标记传递给本进程执行的任务
+            threading.Thread(target=self._watch_cancellations, name='job-cancel-watcher',
+                             daemon=True).start()
+
+    def submit(self, job: TranslationJob, func: Callable[[TranslationJob], Dict]) -> TranslationJob:
+        """
+        提交任务到工作线程池
+
+        Args:
+            job: 翻译任务
+            func: 任务函数，接收任务对象并返回结果字典
+
+        Returns:
+            提交的任务
+        """
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        if self.store is not None:
+            job.attach_store(self.store)
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def add(self, job: TranslationJob) -> TranslationJob:
+        """
+        登记不需要执行的任务（例如直接命中结果缓存的任务）
+
+        Args:
+            job: 翻译任务
+
+        Returns:
+            登记的任务
+        """
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        if self.store is not None:
+            job.attach_store(self.store)
+        return job
+
+    def _prune(self):
+        """移除超过保留时间的已结束任务（调用方持有锁）"""
+        cutoff = time.time() - JOB_RETENTION
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.prune(cutoff)
+
+    def _watch_cancellations(self):
+        """定期检查本进程中未结束的任务是否有取消标记"""
+        while not self._closing.wait(REMOTE_POLL_INTERVAL):
+            with self._lock:
+                running = [job for job in self._jobs.values() if not job.finished]
+            for job in running:
+                if self.store.cancel_requested(job.job_id):
+                    job.cancel()
+
+    def _run(self, job: TranslationJob, func: Callable[[TranslationJob], Dict]):
+        """在工作线程中执行任务并记录结果"""
+        if job.cancel_event.is_set():
+            # 排队期间已被取消
+            return
+        job.set_status(TranslationJob.RUNNING)
+        try:
+            result = func(job)
+            job.set_status(TranslationJob.DONE, result=result or {})
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.set_status(TranslationJob.CANCELLED)
+                return
+            traceback.print_exc()
+            job.set_status(TranslationJob.FAILED, error=str(e))
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        """
+        获取任务
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务对象，不存在时返回None；其他进程中的任务返回基于快照的只读视图
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            snapshot = self.store.load(job_id)
+            if snapshot is not None:
+                job = RemoteJob(self.store, snapshot)
+        return job
+
+    def active_count(self) -> int:
+        """
+        获取未结束的任务数
+
+        Returns:
+            排队中和执行中的任务数
+        """
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def drain(self, timeout: float) -> int:
+        """
+        平滑关闭：不再接收新任务，等待排队中和执行中的任务完成
+
+        超过等待时间仍未结束的任务被取消（状态变为cancelled，客户端需要重新提交）。
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            被取消的任务数
+        """
+        self._executor.shutdown(wait=False)
+        deadline = time.time() + timeout
+        while self.active_count() and time.time() < deadline:
+            time.sleep(0.5)
+
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if not job.finished]
+        for job in unfinished:
+            job.cancel()
+        # 执行中的任务在下一个检查点停止并记录cancelled状态
+        self._executor.shutdown(wait=True)
+        self._closing.set()
+        return len(unfinished)
+
+    def shutdown(self, wait: bool = True):
+        """
+        关闭工作线程池
+
+        Args:
+            wait: 是否等待执行中的任务完成
+        """
+        self._executor.shutdown(wait=wait)
+        self._closing.set()
@@ -0,0 +1,96 @@
+"""
+流式JSON解析模块 - 在模型逐token返回时增量取出已完整的翻译条目
+期望格式与非流式一致：{"translations": [{"id": "1", "text": "..."}, ...]}，
+每当数组中的一个对象闭合就立即解析并返回，不等待整个响应结束
+"""
+import json
+from typing import Dict, List
+
+
+class TranslationItemParser:
+    """翻译条目增量解析器类 - 每个响应新建一个实例，不是线程安全的"""
+
+    def __init__(self):
+        """初始化解析器"""
+        self._buffer = ''
+        # 已扫描到的位置，新到达的文本只扫描一次
+        self._pos = 0
+        # translations 数组开始之后的位置，-1表示还没找到
+        self._array_start = -1
+        # 当前条目对象的起点、嵌套深度和字符串状态
+        self._item_start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def text(self) -> str:
+        """目前收到的全部文本"""
+        return self._buffer
+
+    def feed(self, delta: str) -> List[Dict]:
+        """
+        追加一段模型输出，返回新完成的条目
+
+        Args:
+            delta: 新到达的文本片段
+
+        Returns:
+            新完成的条目列表（JSON对象，未做id和译文校验）
+        """
+        self._buffer += delta
+        if self._array_start < 0 and not self._find_array():
+            return []
+
+        items = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._item_start = pos
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._decode(buffer[self._item_start:pos + 1])
+                    if item is not None:
+                        items.append(item)
+        self._pos = len(buffer)
+        return items
+
+    def _find_array(self) -> bool:
+        """定位条目数组的起点（兼容代码块包裹和直接返回数组的情况）"""
+        key = self._buffer.find('"translations"')
+        if key >= 0:
+            start = self._buffer.find('[', key)
+        else:
+            # 没有translations键时只接受以数组开头的响应
+            stripped = self._buffer.lstrip()
+            if stripped.startswith('```'):
+                newline = stripped.find('\n')
+                stripped = stripped[newline + 1:].lstrip() if newline >= 0 else ''
+            if not stripped or stripped[0] == '{':
+                return False
+            start = self._buffer.find('[') if stripped[0] == '[' else -1
+        if start < 0:
+            return False
+        self._array_start = self._pos = start + 1
+        return True
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
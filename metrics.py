@@ -0,0 +1,284 @@
+"""
+指标模块 - 进程内的计数器、仪表和直方图
+以Prometheus文本格式导出，供 /metrics 接口使用
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, help_text: str):
+        """
+        初始化指标
+
+        Args:
+            name: 指标名称
+            help_text: 指标说明
+        """
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        """生成指标的样本行"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """
+        渲染为Prometheus文本格式
+
+        Returns:
+            包含HELP、TYPE和样本行的文本
+        """
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """计数器类 - 只增不减"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        增加计数
+
+        Args:
+            amount: 增加量
+            **labels: 标签
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f'{self.name}{_format_labels(key)} {_format_value(value)}'
+                    for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """仪表类 - 可以直接设置，也可以在导出时通过回调读取当前值"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, help_text: str,
+                 callback: Optional[Callable[[], float]] = None):
+        """
+        初始化仪表
+
+        Args:
+            name: 指标名称
+            help_text: 指标说明
+            callback: 导出时调用的取值函数（不带标签）
+        """
+        super().__init__(name, help_text)
+        self._values = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        """
+        设置当前值
+
+        Args:
+            value: 值
+            **labels: 标签
+        """
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values[()] = self.callback()
+        return [f'{self.name}{_format_labels(key)} {_format_value(value)}'
+                for key, value in values.items()]
+
+
+class Histogram(Metric):
+    """直方图类 - 记录耗时等分布"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            name: 指标名称
+            help_text: 指标说明
+            buckets: 分桶上界（升序）
+        """
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        """
+        记录一个观测值
+
+        Args:
+            value: 观测值
+            **labels: 标签
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        计时上下文，退出时记录耗时（秒）
+
+        Args:
+            **labels: 标签
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(key, ("le", _format_value(bound)))} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(series["sum"])}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表类"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str,
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        """注册（或获取已注册的）仪表，已存在时更新回调"""
+        gauge = self._register(Gauge(name, help_text, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """
+        导出所有指标
+
+        Returns:
+            Prometheus文本格式
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'ppt_translator_stage_duration_seconds', '翻译任务各阶段耗时（upload/load/extract/translate/save）'
+)
+API_REQUEST_DURATION = REGISTRY.histogram(
+    'ppt_translator_api_request_duration_seconds', '单次翻译API请求耗时（每次重试单独计）'
+)
+API_REQUESTS = REGISTRY.counter(
+    'ppt_translator_api_requests_total', '翻译API请求数（按结果分类）'
+)
+API_FIRST_ITEM_DURATION = REGISTRY.histogram(
+    'ppt_translator_api_first_item_seconds', '流式模式下从发出请求到解析出第一条译文的耗时'
+)
+API_TOKENS = REGISTRY.counter(
+    'ppt_translator_api_tokens_total', '翻译API消耗的token数（来自响应的usage）'
+)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'ppt_translator_http_requests_total', '通过共享连接池发出的HTTP请求数'
+)
+HTTP_CONNECTIONS_OPENED = REGISTRY.counter(
+    'ppt_translator_http_connections_opened_total', '共享连接池新建的连接数（按阶段：tcp/tls），远小于请求数说明连接被复用'
+)
+
+
+def stage_timer(stage: str):
+    """
+    阶段计时上下文
+
+    Args:
+        stage: 阶段名称
+
+    Returns:
+        计时上下文管理器
+    """
+    return STAGE_DURATION.time(stage=stage)
@@ -5,34 +5,98 @@ PPT处理器 - 核心功能模块
 from pptx import Presentation
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
-from typing import List, Dict, Tuple, Optional
-import re
+from pptx.table import _Cell
+from pptx.text.text import _Paragraph
+from typing import List, Dict, Tuple, Optional, Set
+import os
+import hashlib
+
+from xml_extractor import XMLExtractor, NS_C, R_ID
+from text_classifier import get_text_classifier
+from run_writer import write_paragraph, write_text_body
+from zip_rewriter import rewrite_zip
+
+
+# 文本提取引擎：python（python-pptx对象）或 xml（直接解析幻灯片XML，不构建形状对象，提取结果相同）
+ENGINES = ('python', 'xml')
+DEFAULT_ENGINE = os.getenv('PPT_EXTRACT_ENGINE', 'xml')
+# 保存方式：parts（只重写修改过的部件，其余原样复制）或 package（python-pptx完整重新序列化）
+SAVE_MODES = ('parts', 'package')
+DEFAULT_SAVE_MODE = os.getenv('PPT_SAVE_MODE', 'parts')
 
 
 class PPTProcessor:
     """PPT处理器类"""
     
-    def __init__(self, ppt_path: str):
+    def __init__(self, ppt_path: str, engine: Optional[str] = None,
+                 save_mode: Optional[str] = None):
         """
         初始化PPT处理器
         
         Args:
             ppt_path: PPT文件路径
+            engine: 文本提取引擎（python或xml），默认读取 PPT_EXTRACT_ENGINE
+            save_mode: 保存方式（parts或package），默认读取 PPT_SAVE_MODE
         """
         self.ppt_path = ppt_path
-        self.prs = Presentation(ppt_path)
+        self.engine = engine or DEFAULT_ENGINE
+        if self.engine not in ENGINES:
+            raise ValueError(f"不支持的提取引擎: {self.engine}")
+        self.save_mode = save_mode or DEFAULT_SAVE_MODE
+        if self.save_mode not in SAVE_MODES:
+            raise ValueError(f"不支持的保存方式: {self.save_mode}")
+        
+        # xml引擎在第一次需要python-pptx对象（回填、保存）时才加载
+        self._prs = Presentation(ppt_path) if self.engine == 'python' else None
+        self._slides_by_part = None
+        self._slide_part_names = None
+        # 回填修改过的部件名（parts保存方式只重写这些部件）
+        self._dirty_parts = set()
         self.slides_data = []
+        # 幻灯片索引 -> 该幻灯片的可翻译文本单元（extract_texts一次遍历构建）
+        self._slide_units = None
+    
+    @property
+    def prs(self):
+        """python-pptx的Presentation对象（按需加载）"""
+        if self._prs is None:
+            self._prs = Presentation(self.ppt_path)
+        return self._prs
     
     def extract_texts(self) -> List[Dict]:
         """
         提取所有可翻译的文本
         
+        只遍历一次所有幻灯片，同时构建按幻灯片索引的文本单元表，
+        供get_slide_texts和回填直接使用，不再重复遍历形状。
+        
         Returns:
             包含文本信息的列表，每个元素包含：
             - slide_index: 幻灯片索引
             - shape_index: 形状索引
             - text: 原始文本
             - text_type: 文本类型（textbox, table, chart等）
+            每张幻灯片另有 fingerprint：由文本单元计算的指纹，用于识别未修改的幻灯片
+            xml引擎的文本单元不带对象引用，而是带 part（部件名）和 path（元素路径）
+        """
+        if self.engine == 'xml':
+            texts = XMLExtractor(self.ppt_path, self._should_translate).extract()
+        else:
+            texts = self._extract_with_pptx()
+        
+        for slide_data in texts:
+            slide_data['fingerprint'] = self.fingerprint_units(slide_data['texts'])
+        
+        self.slides_data = texts
+        self._slide_units = {slide_data['slide_index']: slide_data['texts'] for slide_data in texts}
+        return texts
+    
+    def _extract_with_pptx(self) -> List[Dict]:
+        """
+        通过python-pptx对象提取文本（python引擎）
+        
+        Returns:
+            每张幻灯片的文本单元列表（不含fingerprint）
         """
         texts = []
         
@@ -109,7 +173,8 @@ class PPTProcessor:
                         
                         # 坐标轴标签
                         if hasattr(chart, 'category_axis') and chart.category_axis:
-                            if hasattr(chart.category_axis, 'axis_title') and chart.category_axis.axis_title:
+                            # 先检查has_title，直接访问axis_title会给没有标题的坐标轴添加空标题
+                            if chart.category_axis.has_title:
                                 axis_text = chart.category_axis.axis_title.text_frame.text.strip()
                                 if axis_text and self._should_translate(axis_text):
                                     slide_texts.append({
@@ -122,7 +187,7 @@ class PPTProcessor:
                                     })
                         
                         if hasattr(chart, 'value_axis') and chart.value_axis:
-                            if hasattr(chart.value_axis, 'axis_title') and chart.value_axis.axis_title:
+                            if chart.value_axis.has_title:
                                 axis_text = chart.value_axis.axis_title.text_frame.text.strip()
                                 if axis_text and self._should_translate(axis_text):
                                     slide_texts.append({
@@ -156,10 +221,31 @@ class PPTProcessor:
                     'texts': slide_texts
                 })
         
-        self.slides_data = texts
         return texts
     
-    def _should_translate(self, text: str) -> bool:
+    @staticmethod
+    def fingerprint_units(units: List[Dict]) -> str:
+        """
+        计算幻灯片指纹
+        
+        按顺序对文本单元的类型和文本做哈希，文本或结构变化时指纹随之变化
+        
+        Args:
+            units: 幻灯片的文本单元列表
+            
+        Returns:
+            指纹（十六进制SHA-256）
+        """
+        digest = hashlib.sha256()
+        for unit in units:
+            digest.update(unit['text_type'].encode('utf-8'))
+            digest.update(b'\0')
+            digest.update(unit['text'].encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _should_translate(text: str) -> bool:
         """
         判断文本是否需要翻译
         
@@ -169,90 +255,21 @@ class PPTProcessor:
         Returns:
             True表示需要翻译，False表示跳过
         """
-        # 跳过纯数字
-        if text.isdigit():
-            return False
-        
-        # 检查是否包含中文
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-        if chinese_chars == 0:
-            return False
-        
-        total_chars = len(text)
-        if total_chars > 0:
-            chinese_ratio = chinese_chars / total_chars
-            
-            # 如果包含中文，但比例较低，需要更宽松的判断
-            # 对于包含冒号、时间单位等的情况，降低阈值
-            if chinese_ratio < 0.2:
-                # 特殊处理：如果文本包含常见的中文标点或单位，即使比例低也翻译
-                has_chinese_punctuation = bool(re.search(r'[：，。、；]', text))
-                has_time_unit = bool(re.search(r'[小时|分钟|秒|天|年|月]', text))
-                has_chinese_keywords = bool(re.search(r'[轮次|金额|融资|投资|成本|价格|数量]', text))
-                
-                # 如果包含这些特征，即使比例低于20%也翻译
-                if has_chinese_punctuation or has_time_unit or has_chinese_keywords:
-                    return True
-                
-                return False
-        
-        # 包含中文的文本需要翻译
-        return True
+        # 规则和缓存见 text_classifier（可通过环境变量配置阈值、关键词和跳过词）
+        return get_text_classifier().should_translate(text)
     
     def _preserve_format_and_set_font(self, paragraph, translated_text: str):
         """
         保留原有格式并设置字体为Arial
         
+        不再清空段落重建run：段落属性和每个run的字符属性（字号、颜色、加粗等）保持不变，
+        只替换run中的文本；有多个run时按对齐线索分配译文（见 run_writer）。
+        
         Args:
             paragraph: 段落对象
             translated_text: 翻译后的文本
         """
-        # 保存原有格式（从第一个run获取，如果没有run则使用默认值）
-        font_size = None
-        font_color = None
-        font_bold = False
-        font_italic = False
-        east_asian_font = None  # 中文字体
-        
-        if paragraph.runs:
-            first_run = paragraph.runs[0]
-            if first_run.font.size:
-                font_size = first_run.font.size
-            if first_run.font.color and first_run.font.color.type:
-                if first_run.font.color.type == 1:  # RGB color
-                    font_color = first_run.font.color.rgb
-            font_bold = first_run.font.bold if first_run.font.bold is not None else False
-            font_italic = first_run.font.italic if first_run.font.italic is not None else False
-            # 尝试获取中文字体（如果有）
-            if hasattr(first_run.font, 'name') and first_run.font.name:
-                # 保存原字体名称，可能包含中文字体信息
-                pass
-        
-        # 清除原有内容
-        paragraph.clear()
-        
-        # 检查是否包含中文字符
-        has_chinese = bool(re.search(r'[\u4e00-\u9fff]', translated_text))
-        
-        # 添加新文本
-        run = paragraph.add_run()
-        run.text = translated_text
-        
-        # 应用保存的格式
-        if font_size:
-            run.font.size = font_size
-        if font_color:
-            run.font.color.rgb = font_color
-        run.font.bold = font_bold
-        run.font.italic = font_italic
-        
-        # 设置字体：英文字体用Arial
-        # 如果包含中文，中文字体保持原样（不设置，使用系统默认或原字体）
-        run.font.name = 'Arial'
-        
-        # 注意：python-pptx的font.name主要影响拉丁字符
-        # 中文字符通常使用系统默认字体或通过其他方式设置
-        # 这里我们只设置英文字体为Arial，中文字体保持原样
+        write_paragraph(paragraph._p, translated_text)
     
     def update_text(self, slide_index: int, shape_index: int, 
                    original_text: str, translated_text: str,
@@ -274,6 +291,7 @@ class PPTProcessor:
         """
         slide = self.prs.slides[slide_index]
         shape = slide.shapes[shape_index]
+        self._dirty_parts.add(str(slide.part.partname))
         
         # 处理组合形状中的文本
         if sub_shape_index is not None and shape.shape_type == 6:  # GROUP
@@ -319,81 +337,177 @@ class PPTProcessor:
         elif shape.has_table and row_index is not None and col_index is not None:
             # 更新表格单元格
             cell = shape.table.rows[row_index].cells[col_index]
-            # 保存单元格格式
-            if cell.text_frame.paragraphs:
-                paragraph = cell.text_frame.paragraphs[0]
-                self._preserve_format_and_set_font(paragraph, translated_text)
-            else:
-                cell.text = translated_text
-                # 设置字体
-                if cell.text_frame.paragraphs:
-                    for run in cell.text_frame.paragraphs[0].runs:
-                        run.font.name = 'Arial'
+            self._set_cell_text(cell, translated_text)
         
         elif shape.has_chart:
             # 更新图表文本
-            try:
-                chart = shape.chart
-                text_type = kwargs.get('text_type', '')
-                
-                if text_type == 'chart_title' and chart.has_title:
-                    chart.chart_title.text_frame.text = translated_text
-                elif text_type == 'chart_axis':
-                    axis_type = kwargs.get('axis_type', 'category')
-                    if axis_type == 'category' and hasattr(chart, 'category_axis'):
-                        if hasattr(chart.category_axis, 'axis_title'):
-                            chart.category_axis.axis_title.text_frame.text = translated_text
-                    elif axis_type == 'value' and hasattr(chart, 'value_axis'):
-                        if hasattr(chart.value_axis, 'axis_title'):
-                            chart.value_axis.axis_title.text_frame.text = translated_text
-                elif text_type == 'chart_legend' and hasattr(chart, 'legend'):
-                    if hasattr(chart.legend, 'text_frame'):
-                        chart.legend.text_frame.text = translated_text
-            except Exception as e:
-                # 图表更新可能失败，记录错误但继续
-                pass
+            self._dirty_parts.add(str(shape.chart.part.partname))
+            self._set_chart_text(shape.chart, translated_text,
+                                 kwargs.get('text_type', ''), kwargs.get('axis_type'))
+    
+    def _set_cell_text(self, cell, translated_text: str):
+        """
+        更新表格单元格文本（保留各段落和run的格式）
+        
+        Args:
+            cell: 单元格对象
+            translated_text: 翻译后的文本
+        """
+        write_text_body(cell.text_frame._txBody, translated_text)
+    
+    def _set_chart_text(self, chart, translated_text: str, text_type: str,
+                        axis_type: Optional[str] = None):
+        """
+        更新图表文本
+        
+        Args:
+            chart: 图表对象
+            translated_text: 翻译后的文本
+            text_type: 文本类型（chart_title, chart_axis, chart_legend）
+            axis_type: 坐标轴类型（category或value，用于chart_axis）
+        """
+        try:
+            if text_type == 'chart_title' and chart.has_title:
+                write_text_body(chart.chart_title.text_frame._txBody, translated_text)
+            elif text_type == 'chart_axis':
+                axis_type = axis_type or 'category'
+                if axis_type == 'category' and hasattr(chart, 'category_axis'):
+                    if hasattr(chart.category_axis, 'axis_title'):
+                        write_text_body(chart.category_axis.axis_title.text_frame._txBody,
+                                        translated_text)
+                elif axis_type == 'value' and hasattr(chart, 'value_axis'):
+                    if hasattr(chart.value_axis, 'axis_title'):
+                        write_text_body(chart.value_axis.axis_title.text_frame._txBody,
+                                        translated_text)
+            elif text_type == 'chart_legend' and hasattr(chart, 'legend'):
+                if hasattr(chart.legend, 'text_frame'):
+                    write_text_body(chart.legend.text_frame._txBody, translated_text)
+        except Exception as e:
+            # 图表更新可能失败，记录错误但继续
+            pass
+    
+    def apply_translation(self, item: Dict, translated_text: str) -> bool:
+        """
+        将译文直接写入extract_texts捕获的对象（段落、单元格、图表）
+        
+        与update_text不同，不再通过幻灯片/形状索引重新定位，也不做文本匹配。
+        
+        Args:
+            item: extract_texts返回的文本单元
+            translated_text: 翻译后的文本
+            
+        Returns:
+            True表示已写入，False表示文本类型不支持
+        """
+        text_type = item['text_type']
+        if 'part' in item and not any(key in item for key in ('paragraph', 'cell', 'chart')):
+            self._attach_handles(item)
+        
+        if text_type in ('textbox', 'group_textbox'):
+            self._preserve_format_and_set_font(item['paragraph'], translated_text)
+            self._dirty_parts.add(self._part_name(item))
+        elif text_type == 'table':
+            self._set_cell_text(item['cell'], translated_text)
+            self._dirty_parts.add(self._part_name(item))
+        elif text_type in ('chart_title', 'chart_axis', 'chart_legend'):
+            self._set_chart_text(item['chart'], translated_text, text_type, item.get('axis_type'))
+            self._dirty_parts.add(item.get('chart_part') or str(item['chart'].part.partname))
+        else:
+            return False
+        
+        return True
+    
+    def _part_name(self, item: Dict) -> str:
+        """文本单元所在幻灯片的部件名"""
+        if 'part' in item:
+            return item['part']
+        if self._slide_part_names is None:
+            self._slide_part_names = [str(slide.part.partname) for slide in self.prs.slides]
+        return self._slide_part_names[item['slide_index']]
+    
+    def _attach_handles(self, item: Dict):
+        """
+        按xml引擎记录的部件名和元素路径找到python-pptx对象，写入文本单元
+        
+        Args:
+            item: xml引擎提取的文本单元
+        """
+        if self._slides_by_part is None:
+            self._slides_by_part = {str(slide.part.partname): slide for slide in self.prs.slides}
+        
+        slide = self._slides_by_part[item['part']]
+        element = slide.element.find(item['path'])
+        text_type = item['text_type']
+        
+        if text_type in ('textbox', 'group_textbox'):
+            item['paragraph'] = _Paragraph(element, slide)
+        elif text_type == 'table':
+            item['cell'] = _Cell(element, slide)
+        else:
+            r_id = element.find(f'.//{{{NS_C}}}chart').get(R_ID)
+            item['chart'] = slide.part.related_part(r_id).chart
+    
+    def apply_slide_translations(self, slide_index: int, text_map: Dict[str, str],
+                                 skip: Optional[Set[int]] = None) -> int:
+        """
+        将整张幻灯片的翻译映射批量写回
+        
+        Args:
+            slide_index: 幻灯片索引
+            text_map: 翻译映射字典 {原文: 译文}
+            skip: 已经单独回填过的文本单元（id(单元)），不再重复写入
+            
+        Returns:
+            写入的文本单元数量
+        """
+        if self._slide_units is None:
+            self.extract_texts()
+        
+        updated = 0
+        for item in self._slide_units.get(slide_index, []):
+            if skip and id(item) in skip:
+                continue
+            translated_text = text_map.get(item['text'])
+            if translated_text is not None and self.apply_translation(item, translated_text):
+                updated += 1
+        
+        return updated
     
     def save(self, output_path: str):
         """
         保存PPT文件
         
+        parts方式只重新序列化回填修改过的幻灯片和图表部件，图片、视频、版式等
+        其余条目按原始压缩字节复制；直接修改prs对象的调用方应使用package方式。
+        
         Args:
             output_path: 输出文件路径
         """
-        self.prs.save(output_path)
+        if self.save_mode == 'package':
+            self.prs.save(output_path)
+            return
+        
+        replacements = {}
+        if self._dirty_parts:
+            parts = {str(part.partname): part for part in self.prs.part.package.iter_parts()}
+            replacements = {name.lstrip('/'): parts[name].blob for name in self._dirty_parts}
+        rewrite_zip(self.ppt_path, output_path, replacements)
     
     def get_slide_texts(self, slide_index: int) -> List[str]:
         """
         获取指定幻灯片的所有文本（用于上下文翻译）
         
+        直接读取extract_texts构建的文本单元表（包括图表文本），
+        尚未提取时先执行一次extract_texts。
+        
         Args:
             slide_index: 幻灯片索引
             
         Returns:
-            文本列表
+            文本列表（去重，保持出现顺序）
         """
-        texts = []
-        slide = self.prs.slides[slide_index]
+        if self._slide_units is None:
+            self.extract_texts()
         
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for paragraph in shape.text_frame.paragraphs:
-                    text = paragraph.text.strip()
-                    if text and self._should_translate(text):
-                        texts.append(text)
-            elif shape.has_table:
-                for row in shape.table.rows:
-                    for cell in row.cells:
-                        text = cell.text.strip()
-                        if text and self._should_translate(text):
-                            texts.append(text)
-            elif shape.shape_type == 6:  # GROUP - 处理组合形状
-                for sub_shape in shape.shapes:
-                    if sub_shape.has_text_frame:
-                        for paragraph in sub_shape.text_frame.paragraphs:
-                            text = paragraph.text.strip()
-                            if text and self._should_translate(text):
-                                texts.append(text)
-        
-        return texts
-
+        units = self._slide_units.get(slide_index, [])
+        return list(dict.fromkeys(item['text'] for item in units))
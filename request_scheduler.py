@@ -0,0 +1,264 @@
+"""
+请求调度模块 - 包装翻译API调用
+提供单次请求超时、指数退避重试（带随机抖动）、遵守Retry-After，
+以及进程内共享的每分钟请求数/token数限流
+"""
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, TypeVar
+
+import openai
+
+
+T = TypeVar('T')
+
+# 单次请求超时（秒）
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv('TRANSLATE_REQUEST_TIMEOUT', '120'))
+# 最大重试次数（不含第一次请求）
+DEFAULT_MAX_RETRIES = int(os.getenv('TRANSLATE_MAX_RETRIES', '5'))
+# 退避基础时间和上限（秒）
+DEFAULT_BACKOFF_BASE = float(os.getenv('TRANSLATE_BACKOFF_BASE', '1.0'))
+DEFAULT_BACKOFF_MAX = float(os.getenv('TRANSLATE_BACKOFF_MAX', '60'))
+# 每分钟请求数和token数上限，0表示不限制
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv('TRANSLATE_REQUESTS_PER_MINUTE', '0'))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv('TRANSLATE_TOKENS_PER_MINUTE', '0'))
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """可重试的后端错误（非OpenAI SDK的后端使用）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """
+        初始化错误
+
+        Args:
+            message: 错误信息
+            retry_after: 建议等待的秒数
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶类 - 按每分钟速率补充令牌，线程安全"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            per_minute: 每分钟补充的令牌数，0表示不限制
+            capacity: 桶容量，默认等于每分钟速率（允许一分钟的突发量）
+        """
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """按经过的时间补充令牌（调用方持有锁）"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.per_minute / 60)
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1):
+        """
+        获取令牌，不足时阻塞等待
+
+        超过桶容量的请求按容量计算，避免永远等不到。
+
+        Args:
+            amount: 需要的令牌数
+        """
+        if self.per_minute <= 0:
+            return
+
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) * 60 / self.per_minute
+            time.sleep(wait)
+
+    def consume(self, amount: float):
+        """
+        直接扣除令牌（可扣成负数），用于按实际用量修正预估
+
+        Args:
+            amount: 扣除的令牌数
+        """
+        if self.per_minute <= 0:
+            return
+
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    从错误响应中读取Retry-After（秒）
+
+    Args:
+        error: API错误
+
+    Returns:
+        建议等待的秒数，没有时返回None
+    """
+    if isinstance(error, RetryableError):
+        return error.retry_after
+
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    # HTTP日期格式
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    判断错误是否可以重试
+
+    Args:
+        error: 调用API时抛出的异常
+
+    Returns:
+        True表示可以重试（超时、连接错误、限流、服务端错误）
+    """
+    if isinstance(error, (RetryableError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class RequestScheduler:
+    """请求调度器类 - 限流、超时和重试"""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX):
+        """
+        初始化请求调度器
+
+        Args:
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            tokens_per_minute: 每分钟token数上限，0表示不限制
+            timeout: 单次请求超时（秒）
+            max_retries: 最大重试次数
+            backoff_base: 退避基础时间（秒）
+            backoff_max: 退避时间上限（秒）
+        """
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        计算第attempt次重试前的等待时间（指数退避 + 全抖动）
+
+        Args:
+            attempt: 重试序号，从0开始
+
+        Returns:
+            等待秒数
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, func: Callable[[float], T], estimated_tokens: int = 0) -> T:
+        """
+        在限流和重试保护下执行一次API调用
+
+        Args:
+            func: 实际发起请求的函数，参数为本次请求的超时时间（秒）
+            estimated_tokens: 预估消耗的token数（用于token限流）
+
+        Returns:
+            func的返回值
+        """
+        attempt = 0
+        while True:
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated_tokens)
+
+            try:
+                return func(self.timeout)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+
+                retry_after = get_retry_after(e)
+                if retry_after is not None:
+                    delay = min(retry_after, self.backoff_max)
+                else:
+                    delay = self.backoff_delay(attempt)
+                attempt += 1
+                time.sleep(delay)
+
+    def record_usage(self, actual_tokens: int, estimated_tokens: int):
+        """
+        用实际token用量修正token限流
+
+        Args:
+            actual_tokens: 响应中的实际token用量
+            estimated_tokens: 请求前的预估值
+        """
+        if actual_tokens > estimated_tokens:
+            self.token_bucket.consume(actual_tokens - estimated_tokens)
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """
+    获取进程内共享的请求调度器（所有任务共用同一套限流）
+
+    Returns:
+        请求调度器实例
+    """
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
@@ -0,0 +1,214 @@
+"""
+结果缓存模块 - 按上传文件内容和翻译设置缓存翻译结果
+同一份PPT在相同设置下重复上传时直接返回已有的输出文件
+清单保存在 outputs/ 下的JSON文件中，重启后仍然有效；超出大小上限时淘汰最久未使用的结果
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+OUTPUT_DIR = 'outputs'
+MANIFEST_NAME = 'result_cache.json'
+# 缓存的输出文件总大小上限
+DEFAULT_MAX_BYTES = int(float(os.getenv('RESULT_CACHE_MAX_MB', '2048')) * 1024 * 1024)
+
+
+def output_path(file_id: str, directory: str = OUTPUT_DIR) -> str:
+    """
+    获取输出文件路径
+
+    Args:
+        file_id: 文件ID
+        directory: 输出目录
+
+    Returns:
+        输出文件路径
+    """
+    return os.path.join(directory, f'{file_id}_translated.pptx')
+
+
+def sidecar_path(file_id: str, directory: str = OUTPUT_DIR) -> str:
+    """
+    获取输出文件旁的幻灯片指纹文件路径
+
+    Args:
+        file_id: 文件ID
+        directory: 输出目录
+
+    Returns:
+        指纹文件路径
+    """
+    return os.path.join(directory, f'{file_id}_translated.slides.json')
+
+
+class ResultCache:
+    """结果缓存类 - 内容寻址，线程安全"""
+
+    def __init__(self, directory: str = OUTPUT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化结果缓存
+
+        Args:
+            directory: 输出目录（清单文件也保存在这里）
+            max_bytes: 缓存的输出文件总大小上限（字节）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @staticmethod
+    def make_key(file_sha256: str, settings: Dict) -> str:
+        """
+        生成缓存键
+
+        Args:
+            file_sha256: 上传文件的SHA-256
+            settings: 影响译文的设置（后端、模型、提示词版本等）
+
+        Returns:
+            缓存键
+        """
+        payload = file_sha256 + '\0' + json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load(self) -> Dict[str, Dict]:
+        """读取清单，丢弃输出文件已不存在的条目"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                entries = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            return {}
+
+        return {key: entry for key, entry in entries.items()
+                if os.path.exists(output_path(entry['file_id'], self.directory))}
+
+    def _reload(self):
+        """
+        以磁盘上的清单为准重新读取（调用方持有锁）
+
+        其他工作进程新增和淘汰的条目都以清单为准：内存中已被其他进程淘汰的条目不能再写回清单，
+        否则之后的命中会指向已删除的输出文件
+        """
+        self._entries = self._load()
+
+    def _save(self):
+        """写入清单（先写临时文件再改名，避免写到一半的清单）（调用方持有锁）"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self._entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        查找缓存的结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存条目（file_id、result等），未命中时返回None
+        """
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if not os.path.exists(output_path(entry['file_id'], self.directory)):
+                del self._entries[key]
+                self._save()
+                return None
+
+            entry['last_used'] = time.time()
+            self._save()
+            return dict(entry)
+
+    def store(self, key: str, file_id: str, result: Optional[Dict] = None):
+        """
+        登记翻译结果，必要时淘汰旧结果
+
+        Args:
+            key: 缓存键
+            file_id: 输出文件ID
+            result: 任务结果（命中时原样返回）
+        """
+        path = output_path(file_id, self.directory)
+        if not os.path.exists(path):
+            return
+
+        now = time.time()
+        with self._lock:
+            self._reload()
+            self._entries[key] = {
+                'file_id': file_id,
+                'size': os.path.getsize(path),
+                'result': result or {},
+                'created_at': now,
+                'last_used': now
+            }
+            self._evict(keep=key)
+            self._save()
+
+    def _evict(self, keep: Optional[str] = None):
+        """按最近使用时间淘汰，直到总大小不超过上限（调用方持有锁）"""
+        total = sum(entry['size'] for entry in self._entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for key in sorted(self._entries, key=lambda k: self._entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self._entries.pop(key)
+            total -= entry['size']
+            for path in (output_path(entry['file_id'], self.directory),
+                         sidecar_path(entry['file_id'], self.directory)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        """
+        获取统计信息
+
+        Returns:
+            包含条目数和总大小的字典
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(entry['size'] for entry in self._entries.values())
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    获取进程内共享的结果缓存
+
+    设置 RESULT_CACHE_ENABLED=0 可关闭结果缓存。
+
+    Returns:
+        结果缓存实例，关闭时返回None
+    """
+    global _default_cache
+
+    if os.getenv('RESULT_CACHE_ENABLED', '1') == '0':
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
@@ -0,0 +1,197 @@
+"""
+run级回填模块 - 把译文写回段落时保留原有的 a:pPr / a:rPr
+不再清空段落重建run：原有的run、域和软换行保持不变，只修改 a:t 中的文本，
+段落有多个run时按对齐线索把译文分配到各个run，混合格式（加粗的数字、不同颜色的词）得以保留
+"""
+import re
+from typing import List, Optional, Tuple
+
+from pptx.text.text import Font
+
+from xml_extractor import A_P, A_R, A_BR, A_FLD, A_T, paragraph_text
+
+
+# 译文中拉丁字符使用的字体
+DEFAULT_LATIN_FONT = 'Arial'
+
+_CJK = re.compile(r'[\u4e00-\u9fff]')
+# a:t 中不允许出现的控制字符（与python-pptx一致，替换为 _xHHHH_ 转义）
+_CTRL_CHARS = re.compile(r'[\x00-\x08\x0B-\x1F]')
+
+
+def _escape(text: str) -> str:
+    return _CTRL_CHARS.sub(lambda match: '_x%04X_' % ord(match.group(0)), text)
+
+
+def _run_text(run) -> str:
+    t = run.find(A_T)
+    return (t.text or '') if t is not None else ''
+
+
+def _set_run_text(run, text: str):
+    t = run.find(A_T)
+    if t is None:
+        t = run.makeelement(A_T, {})
+        run.append(t)
+    t.text = _escape(text)
+
+
+def _snap_to_space(text: str, target: int, low: int) -> int:
+    """把切分位置移动到最近的空格之后（找不到时保持原位置），且不小于low"""
+    best = None
+    for pos in range(max(low, 1), len(text)):
+        if text[pos - 1] == ' ' and (best is None or abs(pos - target) < abs(best - target)):
+            best = pos
+    return max(low, target if best is None else best)
+
+
+def _split_proportional(text: str, weights: List[int]) -> List[str]:
+    """按权重（原run的文本长度）切分文本，切分点尽量落在词边界"""
+    total = sum(weights)
+    pieces = []
+    start = 0
+    acc = 0
+    for weight in weights[:-1]:
+        acc += weight
+        cut = _snap_to_space(text, round(len(text) * acc / total), start)
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
+
+
+def distribute(run_texts: List[str], text: str) -> List[str]:
+    """
+    把译文分配到原来的各个run
+
+    对齐线索：不含中文的run文本（数字、英文术语、域的值等）如果原样出现在译文中，
+    该run就对应译文中的这一段；其余run按原文长度比例分配锚点之间的文本，切分点尽量落在空格处。
+
+    Args:
+        run_texts: 原来各个run的文本
+        text: 译文
+
+    Returns:
+        与run_texts一一对应的新文本（可能为空字符串）
+    """
+    count = len(run_texts)
+    if count == 1:
+        return [text]
+
+    # 锚点：(run下标, 译文起点, 译文终点)，按顺序单调匹配
+    anchors = []
+    cursor = 0
+    for i, run_text in enumerate(run_texts):
+        key = run_text.strip()
+        if not key or _CJK.search(key):
+            continue
+        pos = text.find(key, cursor)
+        if pos >= 0:
+            anchors.append((i, pos, pos + len(key)))
+            cursor = pos + len(key)
+
+    result = [''] * count
+    prev_run, prev_end = -1, 0
+    for i, start, end in anchors + [(count, len(text), len(text))]:
+        gap = text[prev_end:start]
+        # 只有空白的run（原文中的分隔空格）不分配译文，除非锚点之间只有这样的run
+        gap_runs = ([j for j in range(prev_run + 1, i) if run_texts[j].strip()]
+                    or list(range(prev_run + 1, i)))
+        if gap_runs:
+            weights = [max(1, len(run_texts[j].strip())) for j in gap_runs]
+            for j, piece in zip(gap_runs, _split_proportional(gap, weights)):
+                result[j] = piece
+        elif gap:
+            # 两个锚点之间没有其他run：并入前一个锚点（开头的文本并入后一个）
+            if prev_run >= 0:
+                result[prev_run] += gap
+            else:
+                result[i] = gap
+        if i < count:
+            result[i] += text[start:end]
+        prev_run, prev_end = i, end
+
+    return result
+
+
+def _segments(p) -> Tuple[List[List], List]:
+    """按软换行把段落中的run和域分段，返回 (各段的文本元素, 软换行元素)"""
+    segments = [[]]
+    breaks = []
+    for child in p:
+        if child.tag in (A_R, A_FLD):
+            segments[-1].append(child)
+        elif child.tag == A_BR:
+            breaks.append(child)
+            segments.append([])
+    return segments, breaks
+
+
+def write_paragraph(p, text: str, latin_font: Optional[str] = DEFAULT_LATIN_FONT):
+    """
+    把译文写入段落，保留段落属性和各个run的字符属性
+
+    译文中的软换行（\\v）与原段落的软换行数量一致时逐段对应；
+    不一致时去掉原有软换行，整段分配。没有分到文本的run被删除。
+
+    Args:
+        p: a:p 元素（python-pptx解析的元素）
+        text: 译文
+        latin_font: 写入的run使用的拉丁字体，None表示不修改
+    """
+    segments, breaks = _segments(p)
+    lines = text.split('\v')
+
+    if len(lines) != len(segments) or any(line and not runs for line, runs in zip(lines, segments)):
+        for br in breaks:
+            p.remove(br)
+        segments = [[run for runs in segments for run in runs]]
+        lines = [' '.join(line.strip() for line in lines if line.strip())]
+
+    if not any(segments):
+        # 没有任何run（例如只有段落属性），新建一个run
+        segments = [[p.add_r()]]
+
+    for runs, line in zip(segments, lines):
+        if not runs:
+            continue
+        pieces = distribute([_run_text(run) for run in runs], line)
+        kept = 0
+        for run, piece in zip(runs, pieces):
+            if not piece and (kept or run is not runs[-1]):
+                p.remove(run)
+                continue
+            _set_run_text(run, piece)
+            if latin_font:
+                Font(run.get_or_add_rPr()).name = latin_font
+            kept += 1
+
+
+def write_text_body(body, text: str, latin_font: Optional[str] = DEFAULT_LATIN_FONT):
+    """
+    把译文写入文本框（表格单元格、图表标题等）
+
+    译文的行数与原有非空段落数一致时逐段写入；否则整体写入第一个非空段落，
+    删除其余非空段落（空段落保留）。
+
+    Args:
+        body: p:txBody、a:txBody 或 c:rich 元素
+        text: 译文
+        latin_font: 写入的run使用的拉丁字体，None表示不修改
+    """
+    paragraphs = [p for p in body.iterchildren(A_P) if paragraph_text(p).strip()]
+    lines = [line for line in text.split('\n') if line.strip()]
+
+    if not paragraphs:
+        paragraphs = list(body.iterchildren(A_P))[:1]
+        if not paragraphs:
+            paragraphs = [body.add_p()]
+
+    if len(lines) != len(paragraphs):
+        for p in paragraphs[1:]:
+            body.remove(p)
+        paragraphs = paragraphs[:1]
+        lines = [' '.join(line.strip() for line in lines)]
+
+    for p, line in zip(paragraphs, lines):
+        write_paragraph(p, line.strip(), latin_font)
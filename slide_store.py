@@ -0,0 +1,175 @@
+"""
+幻灯片指纹存储模块 - 修改后重新上传的PPT只翻译有变化的幻灯片
+每个翻译结果旁保存一个指纹文件：{幻灯片指纹: {原文: 译文}}
+指纹只由幻灯片的可翻译文本单元决定，与幻灯片位置和文件其他内容无关
+"""
+import os
+import json
+import glob
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from result_cache import OUTPUT_DIR, sidecar_path
+
+
+# 内存中保留的已读取指纹文件数
+SIDECAR_CACHE_SIZE = 16
+
+
+def _settings_key(settings: Dict) -> str:
+    return json.dumps(settings, sort_keys=True)
+
+
+class SlideStore:
+    """
+    幻灯片指纹存储类 - 指纹索引常驻内存，译文按需从指纹文件读取，线程安全
+
+    多个工作进程共用同一个输出目录：索引中找不到指纹时，如果目录有变化，
+    先读入其他进程新写入的指纹文件再判断
+    """
+
+    def __init__(self, directory: str = OUTPUT_DIR):
+        """
+        初始化指纹存储，扫描已有的指纹文件建立索引
+
+        Args:
+            directory: 输出目录
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        # 设置 -> {指纹: file_id}
+        self._index = {}
+        # file_id -> 指纹文件内容（最近读取的若干个）
+        self._loaded = OrderedDict()
+        # 已读入索引的指纹文件和上次扫描时的目录修改时间
+        self._known = set()
+        self._scanned_mtime = None
+
+        self._scan()
+
+    def _scan(self):
+        """目录有变化时读入尚未索引的指纹文件（调用方持有锁或在初始化中）"""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._scanned_mtime:
+            return
+        self._scanned_mtime = mtime
+
+        pattern = os.path.join(glob.escape(self.directory), '*_translated.slides.json')
+        for path in glob.glob(pattern):
+            file_id = os.path.basename(path)[:-len('_translated.slides.json')]
+            if file_id in self._known:
+                continue
+            self._known.add(file_id)
+            data = self._read(file_id)
+            if data:
+                self._add_to_index(file_id, data)
+
+    def _read(self, file_id: str) -> Optional[Dict]:
+        """读取指纹文件，不存在或损坏时返回None"""
+        try:
+            with open(sidecar_path(file_id, self.directory), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _add_to_index(self, file_id: str, data: Dict):
+        """把指纹文件中的指纹加入索引（调用方持有锁或在初始化中）"""
+        fingerprints = self._index.setdefault(_settings_key(data['settings']), {})
+        for fingerprint in data['slides']:
+            fingerprints[fingerprint] = file_id
+
+    def _sidecar(self, file_id: str) -> Optional[Dict]:
+        """获取指纹文件内容（调用方持有锁）"""
+        if file_id in self._loaded:
+            self._loaded.move_to_end(file_id)
+            return self._loaded[file_id]
+
+        data = self._read(file_id)
+        if data is not None:
+            self._loaded[file_id] = data
+            while len(self._loaded) > SIDECAR_CACHE_SIZE:
+                self._loaded.popitem(last=False)
+        return data
+
+    def lookup(self, settings: Dict, fingerprint: str) -> Optional[Dict[str, str]]:
+        """
+        查找相同设置下指纹相同的幻灯片的译文
+
+        Args:
+            settings: 影响译文的设置
+            fingerprint: 幻灯片指纹
+
+        Returns:
+            {原文: 译文}，没有记录时返回None
+        """
+        with self._lock:
+            settings_key = _settings_key(settings)
+            file_id = self._index.get(settings_key, {}).get(fingerprint)
+            if file_id is None:
+                # 可能由其他工作进程翻译过
+                self._scan()
+                file_id = self._index.get(settings_key, {}).get(fingerprint)
+                if file_id is None:
+                    return None
+            fingerprints = self._index[settings_key]
+
+            data = self._sidecar(file_id)
+            if data is None:
+                # 指纹文件已随输出文件一起被淘汰
+                for key in [fp for fp, fid in fingerprints.items() if fid == file_id]:
+                    del fingerprints[key]
+                return None
+
+            return data['slides'].get(fingerprint)
+
+    def save(self, file_id: str, settings: Dict, slides: Dict[str, Dict[str, str]]):
+        """
+        在输出文件旁保存本次结果的指纹文件
+
+        Args:
+            file_id: 输出文件ID
+            settings: 影响译文的设置
+            slides: {幻灯片指纹: {原文: 译文}}
+        """
+        data = {'settings': settings, 'slides': slides}
+        path = sidecar_path(file_id, self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._known.add(file_id)
+            self._add_to_index(file_id, data)
+            self._loaded[file_id] = data
+            while len(self._loaded) > SIDECAR_CACHE_SIZE:
+                self._loaded.popitem(last=False)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_slide_store() -> Optional[SlideStore]:
+    """
+    获取进程内共享的指纹存储
+
+    设置 SLIDE_REUSE_ENABLED=0 可关闭幻灯片级复用。
+
+    Returns:
+        指纹存储实例，关闭时返回None
+    """
+    global _default_store
+
+    if os.getenv('SLIDE_REUSE_ENABLED', '1') == '0':
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SlideStore()
+        return _default_store
@@ -0,0 +1,308 @@
+"""
+低内存翻译流水线 - 按幻灯片窗口流式处理大PPT
+每个窗口依次执行：读取幻灯片XML → 提取 → 翻译 → 回填 → 写入输出ZIP → 释放，
+不加载整个Presentation，也不在内存中保留全部文本单元，峰值内存不随幻灯片数增长
+"""
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+from pptx.chart.chart import Chart
+from pptx.opc.oxml import serialize_part_xml
+from pptx.oxml import parse_xml
+from pptx.table import _Cell
+from pptx.text.text import _Paragraph
+
+from ppt_processor import PPTProcessor
+from translator import Translator, ItemCallback
+from batch_planner import plan_batches, DEFAULT_TOKEN_BUDGET
+from translation_pipeline import DEFAULT_MAX_IN_FLIGHT, TranslationCancelled, request_executor, wait_result
+from xml_extractor import XMLExtractor, slide_part_names
+from zip_rewriter import ZipRewriter
+
+
+# 1表示所有PPT都使用低内存模式
+LOW_MEMORY_MODE = os.getenv('LOW_MEMORY_MODE', '0') == '1'
+# 幻灯片数达到该值时自动使用低内存模式，0表示不自动切换
+LOW_MEMORY_MIN_SLIDES = int(os.getenv('LOW_MEMORY_MIN_SLIDES', '300'))
+# 每个窗口同时驻留内存的幻灯片数
+DEFAULT_WINDOW = int(os.getenv('LOW_MEMORY_WINDOW', '16'))
+# 跨窗口复用的最近译文条数（页眉、页脚等重复文本不再重复发送）
+RECENT_TRANSLATIONS = 2048
+
+# 图表部件（随引用它的幻灯片一起写出）
+_CHART_PART = re.compile(r'^ppt/charts/[^/]+\.xml$')
+
+
+def count_slides(ppt_path: str) -> int:
+    """
+    读取幻灯片数（只解析presentation.xml）
+
+    Args:
+        ppt_path: PPT文件路径
+
+    Returns:
+        幻灯片数
+    """
+    with zipfile.ZipFile(ppt_path) as zf:
+        return len(slide_part_names(zf))
+
+
+def use_low_memory(ppt_path: str) -> bool:
+    """
+    判断PPT是否应使用低内存模式
+
+    Args:
+        ppt_path: PPT文件路径
+
+    Returns:
+        True表示使用低内存模式
+    """
+    if LOW_MEMORY_MODE:
+        return True
+    if LOW_MEMORY_MIN_SLIDES <= 0:
+        return False
+    return count_slides(ppt_path) >= LOW_MEMORY_MIN_SLIDES
+
+
+class _WindowSlide:
+    """窗口中的一张幻灯片：解析后的XML、文本单元和被引用的图表"""
+
+    def __init__(self, slide_index: int, info: zipfile.ZipInfo, root, units: List[Dict]):
+        self.slide_index = slide_index
+        self.info = info
+        self.root = root
+        self.units = units
+        # 图表部件名 -> python-pptx图表对象（按需解析）
+        self.charts = OrderedDict()
+        self.modified = False
+        self.modified_charts = set()
+
+    def attach_handles(self, source: zipfile.ZipFile, item: Dict):
+        """按部件内路径找到元素，包装成回填使用的python-pptx对象（不依赖Presentation）"""
+        text_type = item['text_type']
+        if text_type in ('textbox', 'group_textbox'):
+            item['paragraph'] = _Paragraph(self.root.find(item['path']), None)
+        elif text_type == 'table':
+            item['cell'] = _Cell(self.root.find(item['path']), None)
+        else:
+            chart_part = item['chart_part']
+            if chart_part not in self.charts:
+                self.charts[chart_part] = Chart(parse_xml(source.read(chart_part.lstrip('/'))), None)
+            item['chart'] = self.charts[chart_part]
+
+
+def translate_streaming(input_path: str, output_path: str, translator: Translator,
+                        window: Optional[int] = None,
+                        max_in_flight: Optional[int] = None,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        token_budget: Optional[int] = None,
+                        batch_callback: Optional[Callable[[Dict[int, Dict[str, str]]], None]] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        item_callback: Optional[ItemCallback] = None) -> Dict:
+    """
+    低内存模式翻译整份PPT并直接写出结果文件
+
+    先按原始字节复制幻灯片和图表以外的条目，然后逐个窗口处理幻灯片：
+    窗口内的请求并发发送，回填后立即写出修改过的幻灯片和图表部件并释放。
+    幻灯片数达到 PARALLEL_EXTRACT_MIN_SLIDES 时，每个窗口在提取进程池中并行提取，
+    并在翻译当前窗口的同时提取下一个窗口。
+    整份PPT的去重只在窗口内进行，跨窗口的重复文本由最近译文和翻译记忆库复用。
+
+    Args:
+        input_path: 上传的PPT文件路径
+        output_path: 输出文件路径
+        translator: 翻译器
+        window: 每个窗口的幻灯片数，默认读取 LOW_MEMORY_WINDOW
+        max_in_flight: 同时在途的请求上限，默认读取 TRANSLATE_MAX_IN_FLIGHT
+        progress_callback: 进度回调，每写出一张幻灯片调用一次 (已完成数, 总数)
+        token_budget: 每个请求的token预算，默认读取 TRANSLATE_BATCH_TOKEN_BUDGET
+        batch_callback: 每个请求完成时调用，参数为 {幻灯片索引: {原文: 译文}}
+        cancel_event: 取消标志，设置后停止处理并抛出TranslationCancelled（不写出结果文件）
+        item_callback: 每条译文就绪时立即调用，参数为 (幻灯片索引, 原文, 译文)；
+                       回填仍在窗口的请求全部完成后进行
+
+    Returns:
+        统计信息字典：slides_processed, slides_reused, strings_total, strings_sent,
+        dedup_ratio, requests, items_failed, low_memory
+    """
+    window = max(1, window or DEFAULT_WINDOW)
+    token_budget = token_budget or DEFAULT_TOKEN_BUDGET
+    # 只借用回填时的格式处理，xml引擎不会加载Presentation
+    processor = PPTProcessor(input_path, engine='xml')
+    extractor = XMLExtractor(input_path, processor._should_translate)
+    recent = OrderedDict()
+    stats = {'strings_total': 0, 'strings_sent': 0, 'requests': 0}
+    failed = set()
+
+    with ZipRewriter(input_path, output_path) as rewriter, \
+            request_executor(max_in_flight or DEFAULT_MAX_IN_FLIGHT) as executor:
+        source = rewriter.source
+        slide_parts = slide_part_names(source)
+        deferred = {name.lstrip('/') for name in slide_parts}
+        deferred.update(name for name in source.namelist() if _CHART_PART.match(name))
+
+        # 其余条目（母版、版式、媒体等）按原顺序原样复制
+        for info in source.infolist():
+            if info.filename not in deferred:
+                rewriter.copy(info)
+
+        written = set()
+        total = len(slide_parts)
+        parts = list(enumerate(slide_parts))
+        windows = [parts[start:start + window] for start in range(0, total, window)]
+        parallel = extractor.use_parallel(total)
+        # 并行提取时预先提交下一个窗口，翻译当前窗口期间由提取进程处理
+        pending = extractor.submit_parts(windows[0]) if parallel and windows else []
+        if progress_callback:
+            progress_callback(0, total)
+        try:
+            for window_index, window_parts in enumerate(windows):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise TranslationCancelled("翻译已取消")
+                if parallel:
+                    extracted = dict(result for future in pending for result in future.result())
+                    pending = (extractor.submit_parts(windows[window_index + 1])
+                               if window_index + 1 < len(windows) else [])
+                slides = []
+                for slide_index, part_name in window_parts:
+                    info = source.getinfo(part_name.lstrip('/'))
+                    if parallel:
+                        # 没有可翻译文本的幻灯片原样复制，不需要解析
+                        units = extracted[slide_index]
+                        root = parse_xml(source.read(info)) if units else None
+                    else:
+                        root = parse_xml(source.read(info))
+                        units = extractor.extract_slide(source, slide_index, part_name, root=root)
+                    slides.append(_WindowSlide(slide_index, info, root, units))
+
+                window_map = _translate_window(translator, executor, slides, recent, token_budget, stats,
+                                               batch_callback, cancel_event, item_callback, failed)
+
+                for slide in slides:
+                    for item in slide.units:
+                        translated_text = window_map.get(item['text'])
+                        if translated_text is None:
+                            continue
+                        slide.attach_handles(source, item)
+                        if processor.apply_translation(item, translated_text):
+                            if 'chart_part' in item:
+                                slide.modified_charts.add(item['chart_part'])
+                            else:
+                                slide.modified = True
+
+                    if slide.modified:
+                        rewriter.write(slide.info, serialize_part_xml(slide.root))
+                    else:
+                        rewriter.copy(slide.info)
+                    written.add(slide.info.filename)
+
+                    for chart_part, chart in slide.charts.items():
+                        name = chart_part.lstrip('/')
+                        if name in written or chart_part not in slide.modified_charts:
+                            continue
+                        rewriter.write(source.getinfo(name), serialize_part_xml(chart._chartSpace))
+                        written.add(name)
+
+                    if progress_callback:
+                        progress_callback(slide.slide_index + 1, total)
+
+                # 窗口处理完毕，释放XML树和文本单元
+                del slides
+        except Exception:
+            # 出错或取消时不再等待已提交的提取任务
+            for future in pending:
+                future.cancel()
+            raise
+
+        # 没有被修改的图表按原始字节复制
+        for info in source.infolist():
+            if info.filename in deferred and info.filename not in written:
+                rewriter.copy(info)
+
+    strings_total = stats['strings_total']
+    stats.update({
+        'slides_processed': total,
+        'slides_reused': 0,
+        'items_failed': len(failed),
+        'dedup_ratio': round(1 - stats['strings_sent'] / strings_total, 4) if strings_total else 0.0,
+        'low_memory': True
+    })
+    return stats
+
+
+def _translate_window(translator: Translator, executor: ThreadPoolExecutor,
+                      slides: List[_WindowSlide], recent: OrderedDict,
+                      token_budget: int, stats: Dict,
+                      batch_callback: Optional[Callable[[Dict[int, Dict[str, str]]], None]] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      item_callback: Optional[ItemCallback] = None,
+                      failed: Optional[Set[str]] = None) -> Dict[str, str]:
+    """
+    翻译一个窗口中的全部文本
+
+    Args:
+        translator: 翻译器
+        executor: 发送请求的线程池
+        slides: 窗口中的幻灯片
+        recent: 最近译文 {原文: 译文}（按使用顺序，超出上限时淘汰最旧的）
+        token_budget: 每个请求的token预算
+        stats: 累计统计（strings_total、strings_sent、requests）
+        batch_callback: 每个请求完成时调用
+        cancel_event: 取消标志
+        item_callback: 每条译文就绪时调用
+        failed: 累计翻译失败（保留原文）的文本，这些文本不进入最近译文，后续窗口重新翻译
+
+    Returns:
+        本窗口的翻译映射 {原文: 译文}
+    """
+    window_map = {}
+    requests = []
+    seen = set()
+
+    for slide in slides:
+        slide_texts = list(dict.fromkeys(item['text'] for item in slide.units))
+        stats['strings_total'] += len(slide_texts)
+
+        owned_texts = []
+        for text in slide_texts:
+            if text in seen:
+                continue
+            seen.add(text)
+            if text in recent:
+                recent.move_to_end(text)
+                window_map[text] = recent[text]
+            else:
+                owned_texts.append(text)
+        requests.append((slide.slide_index, owned_texts))
+        stats['strings_sent'] += len(owned_texts)
+
+    batches = plan_batches(requests, token_budget)
+    stats['requests'] += len(batches)
+    futures = [executor.submit(translator.translate_batch, batch, item_callback, failed)
+               for batch in batches]
+    try:
+        for future in futures:
+            result = wait_result(future, cancel_event)
+            if batch_callback:
+                batch_callback(result)
+            for slide_map in result.values():
+                window_map.update(slide_map)
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+    for text, translated_text in window_map.items():
+        if failed and text in failed:
+            continue
+        recent[text] = translated_text
+        recent.move_to_end(text)
+    while len(recent) > RECENT_TRANSLATIONS:
+        recent.popitem(last=False)
+
+    return window_map
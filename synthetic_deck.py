@@ -0,0 +1,112 @@
+"""
+合成PPT生成器 - 用python-pptx生成用于基准测试的中文PPT
+幻灯片数、文本框、组合形状、表格和图表数量均可控制
+"""
+import random
+import argparse
+
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+
+
+# 重复出现的页眉页脚（模拟真实PPT中的样板文本）
+HEADER_TEXT = "某某生物科技有限公司 内部资料"
+FOOTER_TEXT = "仅供内部培训使用"
+
+PHRASES = [
+    "研究背景", "样本量：120例", "检测灵敏度显著提升", "宏基因组测序", "病原体检测流程",
+    "临床验证结果", "实验设计", "数据分析方法", "质量控制标准", "检测周期：24小时",
+    "融资轮次", "投资金额", "成本分析", "市场价格", "年度目标", "团队介绍",
+    "技术路线", "核心优势", "应用场景", "合作伙伴", "未来规划", "风险评估",
+]
+
+
+def _sentence(rng: random.Random, words: int = 3) -> str:
+    """随机拼接几个短语"""
+    return "，".join(rng.choice(PHRASES) for _ in range(words))
+
+
+def generate_deck(path: str, slides: int = 50, textboxes: int = 3, groups: int = 1,
+                  tables: int = 1, charts: int = 1, table_size: int = 3, seed: int = 0):
+    """
+    生成合成PPT
+
+    Args:
+        path: 输出文件路径
+        slides: 幻灯片数量
+        textboxes: 每张幻灯片的文本框数量（每个文本框3个段落）
+        groups: 每张幻灯片的组合形状数量（每个组合包含2个文本框）
+        tables: 每张幻灯片的表格数量
+        charts: 每张幻灯片的图表数量
+        table_size: 表格的行数和列数
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    prs = Presentation()
+    layout = prs.slide_layouts[5]  # 仅标题
+
+    for slide_idx in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"{rng.choice(PHRASES)}（第{slide_idx + 1}部分）"
+
+        header = slide.shapes.add_textbox(Inches(0.2), Inches(0.1), Inches(4), Inches(0.3))
+        header.text_frame.text = HEADER_TEXT
+        footer = slide.shapes.add_textbox(Inches(0.2), Inches(7.1), Inches(4), Inches(0.3))
+        footer.text_frame.text = FOOTER_TEXT
+
+        for i in range(textboxes):
+            box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5 + i * 0.8), Inches(4.5), Inches(0.7))
+            text_frame = box.text_frame
+            text_frame.text = _sentence(rng)
+            for _ in range(2):
+                paragraph = text_frame.add_paragraph()
+                run = paragraph.add_run()
+                run.text = _sentence(rng, 2)
+                run.font.size = Pt(14)
+                run = paragraph.add_run()
+                run.text = f" {rng.randint(1, 999)}例"
+                run.font.bold = True
+
+        for i in range(groups):
+            group = slide.shapes.add_group_shape()
+            for j in range(2):
+                box = group.shapes.add_textbox(Inches(5.2 + j * 2), Inches(1.5 + i * 0.8),
+                                               Inches(1.8), Inches(0.6))
+                box.text_frame.text = _sentence(rng, 1)
+
+        for i in range(tables):
+            shape = slide.shapes.add_table(table_size, table_size, Inches(5.2), Inches(3 + i * 1.5),
+                                           Inches(4), Inches(1.2))
+            for cell_idx, cell in enumerate(shape.table.iter_cells()):
+                cell.text = rng.choice(PHRASES) if cell_idx % 3 else str(rng.randint(1, 100))
+
+        for i in range(charts):
+            chart_data = CategoryChartData()
+            chart_data.categories = [rng.choice(PHRASES) for _ in range(3)]
+            chart_data.add_series("检测数量", [rng.randint(1, 100) for _ in range(3)])
+            chart = slide.shapes.add_chart(
+                XL_CHART_TYPE.COLUMN_CLUSTERED, Inches(0.5), Inches(4.2 + i * 0.5),
+                Inches(4), Inches(2.5), chart_data
+            ).chart
+            chart.has_title = True
+            chart.chart_title.text_frame.text = f"{rng.choice(PHRASES)}统计"
+
+    prs.save(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="生成用于基准测试的合成中文PPT")
+    parser.add_argument('output', help="输出文件路径")
+    parser.add_argument('--slides', type=int, default=50)
+    parser.add_argument('--textboxes', type=int, default=3)
+    parser.add_argument('--groups', type=int, default=1)
+    parser.add_argument('--tables', type=int, default=1)
+    parser.add_argument('--charts', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate_deck(args.output, args.slides, args.textboxes, args.groups,
+                  args.tables, args.charts, seed=args.seed)
+    print(f"✅ 已生成 {args.slides} 张幻灯片: {args.output}")
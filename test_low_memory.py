@@ -0,0 +1,143 @@
+"""
+测试低内存模式的内存上限
+生成100张和500张幻灯片的合成PPT，在独立子进程中用mock后端流式翻译，
+检查峰值内存（相对导入模块后的基线）不超过上限，且不随幻灯片数增长；
+并检查300张以上的PPT在低内存模式下由多个提取进程并行提取
+
+使用方法:
+    python3 test_low_memory.py
+    python3 -m pytest test_low_memory.py
+"""
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+
+# 500张幻灯片时允许的峰值内存增量（MB，相对导入模块后的基线）
+MEMORY_CEILING_MB = 40
+# 500张与100张幻灯片的峰值内存之差的上限（MB）
+MEMORY_GROWTH_MB = 15
+# 并行提取测试使用的幻灯片数和提取进程数
+PARALLEL_SLIDES = 320
+PARALLEL_WORKERS = 2
+
+# 当前进程是否已记录进程号（见 _record_extract_pid）
+_pid_logged = False
+
+
+def _measure(deck_path: str, output_path: str):
+    """子进程：低内存模式翻译一份PPT，输出基线和峰值内存（JSON）"""
+    from translator import Translator
+    from request_scheduler import RequestScheduler
+    from translation_backends import MockBackend
+    from streaming_pipeline import translate_streaming
+    # 读取VmHWM：ru_maxrss 在exec之后保留父进程（pytest）的峰值，会掩盖流水线自身的内存
+    from benchmark import peak_rss_mb
+
+    baseline = peak_rss_mb()
+    translator = Translator(scheduler=RequestScheduler(), backend=MockBackend())
+    stats = translate_streaming(deck_path, output_path, translator)
+    print(json.dumps({'baseline': baseline, 'peak': peak_rss_mb(),
+                      'slides': stats['slides_processed']}))
+
+
+def _record_extract_pid(text: str) -> bool:
+    """提取进程中使用的判断函数：第一次调用时记录进程号，判断规则不变"""
+    global _pid_logged
+    if not _pid_logged:
+        with open(os.environ['EXTRACT_PID_LOG'], 'a') as f:
+            f.write(f'{os.getpid()}\n')
+        _pid_logged = True
+    from text_classifier import get_text_classifier
+    return get_text_classifier().should_translate(text)
+
+
+def _extract_workers(deck_path: str, output_path: str):
+    """子进程：低内存模式翻译一份PPT，输出执行了提取的进程数（JSON）"""
+    from ppt_processor import PPTProcessor
+    from translator import Translator
+    from request_scheduler import RequestScheduler
+    from translation_backends import MockBackend
+    from streaming_pipeline import translate_streaming, use_low_memory
+
+    # 提取进程按引用反序列化判断函数，因此能记录实际执行提取的进程
+    PPTProcessor._should_translate = staticmethod(_record_extract_pid)
+    translator = Translator(scheduler=RequestScheduler(), backend=MockBackend())
+    stats = translate_streaming(deck_path, output_path, translator)
+    with open(os.environ['EXTRACT_PID_LOG']) as f:
+        pids = {int(line) for line in f if line.strip()}
+    print(json.dumps({'low_memory': use_low_memory(deck_path), 'slides': stats['slides_processed'],
+                      'workers': len(pids - {os.getpid()}), 'in_parent': os.getpid() in pids}))
+
+
+def _run_child(*args, **env) -> dict:
+    """在全新的子进程中运行本脚本，避免测试进程已占用的内存影响结果"""
+    env = dict(os.environ, TRANSLATION_MEMORY_ENABLED='0',
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)), **env)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), *args],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1]) if output.strip() else {}
+
+
+def test_low_memory_ceiling():
+    """测试低内存模式的峰值内存上限"""
+    print("=" * 50)
+    print("低内存模式内存上限测试")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for slides in (100, 500):
+            deck_path = os.path.join(tmp_dir, f'synthetic_{slides}.pptx')
+            output_path = os.path.join(tmp_dir, f'translated_{slides}.pptx')
+            # 生成PPT也在子进程中进行（python-pptx构建整份PPT会占用大量内存）
+            _run_child('--generate', deck_path, str(slides))
+            results[slides] = _run_child('--measure', deck_path, output_path)
+
+            result = results[slides]
+            print(f"{slides}张幻灯片: 基线 {result['baseline']:.1f}MB, "
+                  f"峰值 {result['peak']:.1f}MB (+{result['peak'] - result['baseline']:.1f}MB)")
+            assert result['slides'] == slides
+
+    increase = results[500]['peak'] - results[500]['baseline']
+    growth = results[500]['peak'] - results[100]['peak']
+    assert increase <= MEMORY_CEILING_MB, f"峰值内存增量 {increase:.1f}MB 超过上限 {MEMORY_CEILING_MB}MB"
+    assert growth <= MEMORY_GROWTH_MB, f"峰值内存随幻灯片数增长 {growth:.1f}MB，超过 {MEMORY_GROWTH_MB}MB"
+    print("✅ 低内存模式峰值内存在上限以内")
+
+
+def test_low_memory_parallel_extract():
+    """测试300张以上的PPT在低内存模式下使用多个提取进程"""
+    print("=" * 50)
+    print("低内存模式并行提取测试")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deck_path = os.path.join(tmp_dir, f'synthetic_{PARALLEL_SLIDES}.pptx')
+        output_path = os.path.join(tmp_dir, f'translated_{PARALLEL_SLIDES}.pptx')
+        _run_child('--generate', deck_path, str(PARALLEL_SLIDES))
+        result = _run_child('--workers', deck_path, output_path,
+                            EXTRACT_WORKERS=str(PARALLEL_WORKERS),
+                            EXTRACT_PID_LOG=os.path.join(tmp_dir, 'extract_pids.log'))
+
+    print(f"{PARALLEL_SLIDES}张幻灯片: 低内存模式 {result['low_memory']}, "
+          f"提取进程 {result['workers']} 个, 主进程参与提取 {result['in_parent']}")
+    assert result['low_memory'] and result['slides'] == PARALLEL_SLIDES
+    assert result['workers'] > 1, f"只有 {result['workers']} 个进程执行了提取"
+    assert not result['in_parent'], "主进程不应串行提取"
+    print("✅ 低内存模式使用多个提取进程")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--generate':
+        from synthetic_deck import generate_deck
+        generate_deck(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        _measure(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--workers':
+        _extract_workers(sys.argv[2], sys.argv[3])
+    else:
+        test_low_memory_ceiling()
+        test_low_memory_parallel_extract()
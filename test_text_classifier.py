@@ -0,0 +1,65 @@
+"""
+测试文本分类器与旧版规则一致
+在合成PPT的文本、边界样本和随机字符串上，比较 TextClassifier（默认配置）
+与重构前的 _should_translate 的判断结果，两者必须完全相同
+
+使用方法:
+    python3 test_text_classifier.py
+    python3 -m pytest test_text_classifier.py
+"""
+import os
+import random
+import tempfile
+
+from text_classifier import TextClassifier, DEFAULT_PUNCTUATION
+from benchmark_classifier import legacy_should_translate, collect_texts, EXTRA_SAMPLES
+from synthetic_deck import generate_deck
+
+
+# 旧版正则字符集中的全部字符（包括其中的 |）
+LEGACY_FEATURE_CHARS = DEFAULT_PUNCTUATION + '小时|分钟秒天年月' + '轮次|金额融资投资成本价格数量'
+RANDOM_SAMPLES = 20000
+
+
+def _parity_samples() -> list:
+    """构造比较用的文本：合成PPT文本、边界样本、低中文比例下的逐字符样本和随机字符串"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deck_path = os.path.join(tmp_dir, 'synthetic.pptx')
+        generate_deck(deck_path, 20)
+        samples = collect_texts(deck_path)
+    samples += EXTRA_SAMPLES
+
+    # 每个特征字符（以及不在字符集中的中文和符号）在不同中文比例下的判断
+    for char in LEGACY_FEATURE_CHARS + '样本数据,.:;/-':
+        for padding in range(0, 16):
+            samples.append(f"{'a' * padding} 样{char}")
+            samples.append(f"{char} {'Revenue ' * (padding // 4)}样")
+
+    rng = random.Random(20240601)
+    alphabet = 'abcXYZ 0123456789|-' + LEGACY_FEATURE_CHARS + '样本数据测序中'
+    for _ in range(RANDOM_SAMPLES):
+        samples.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 30))))
+    return samples
+
+
+def test_classifier_matches_legacy_rules():
+    """测试默认配置的分类器与旧版规则的判断完全一致"""
+    print("=" * 50)
+    print("文本分类器与旧版规则一致性测试")
+    print("=" * 50)
+
+    classifier = TextClassifier(cache_size=0)
+    samples = _parity_samples()
+    mismatches = [(text, legacy_should_translate(text), classifier.classify(text))
+                  for text in samples
+                  if legacy_should_translate(text) != classifier.classify(text)]
+
+    print(f"比较文本数: {len(samples)}，不一致: {len(mismatches)}")
+    for text, legacy, current in mismatches[:10]:
+        print(f"  {text!r}: 旧版 {legacy} -> 当前 {current}")
+    assert not mismatches, f"{len(mismatches)} 个文本的判断与旧版不同"
+    print("✅ 判断结果与旧版一致")
+
+
+if __name__ == '__main__':
+    test_classifier_matches_legacy_rules()
@@ -0,0 +1,192 @@
+"""
+文本分类模块 - 判断提取到的文本是否需要翻译
+规则（参见需求文档）：纯数字原样保留；不含中文跳过；中文比例低于阈值时，
+只有包含中文标点或关键词（时间单位、金额等）才翻译；基因名、缩写等跳过列表中的词不参与判断
+正则在初始化时预编译，同一字符串的判断结果会被缓存
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+
+CJK_PATTERN = r'[\u4e00-\u9fff]'
+# 中文比例低于阈值时，包含这些标点仍然翻译
+DEFAULT_PUNCTUATION = '：，。、；'
+# 中文比例低于阈值时，包含这些词中的任一字符仍然翻译（时间单位和常见业务词）。
+# 与原实现的字符集 [小时|分钟|秒|天|年|月]、[轮次|金额|融资|投资|成本|价格|数量] 逐字一致，
+# 其中的 | 同样按字符匹配，因此保留在默认列表中
+DEFAULT_KEYWORDS = ('小时', '分钟', '秒', '天', '年', '月',
+                    '轮次', '金额', '融资', '投资', '成本', '价格', '数量', '|')
+DEFAULT_MIN_CJK_RATIO = 0.2
+DEFAULT_CACHE_SIZE = 65536
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    """把逗号分隔的配置拆成列表，忽略空项"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def load_terms(path: str) -> List[str]:
+    """
+    从文件读取词表（每行一个，#开头为注释）
+
+    Args:
+        path: 词表文件路径
+
+    Returns:
+        词列表
+    """
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f
+                if line.strip() and not line.lstrip().startswith('#')]
+
+
+class TextClassifier:
+    """文本分类器类 - 规则可配置，线程安全"""
+
+    def __init__(self, min_cjk_ratio: float = DEFAULT_MIN_CJK_RATIO,
+                 keywords: Iterable[str] = DEFAULT_KEYWORDS,
+                 punctuation: str = DEFAULT_PUNCTUATION,
+                 skip_terms: Iterable[str] = (),
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        初始化文本分类器
+
+        Args:
+            min_cjk_ratio: 中文字符比例阈值，低于该比例时需要标点或关键词才翻译
+            keywords: 中文比例低时仍然翻译的关键词（包含其中任一字符即翻译，与原实现一致）
+            punctuation: 中文比例低时仍然翻译的标点字符
+            skip_terms: 不参与判断的词（基因名、缩写、专有名词等），
+                        文本去掉这些词后不含中文则跳过
+            cache_size: 判断结果缓存的字符串数，0表示不缓存
+        """
+        self.min_cjk_ratio = min_cjk_ratio
+        self.keywords = tuple(keywords)
+        self.punctuation = punctuation
+        self.skip_terms = tuple(skip_terms)
+
+        self._cjk_re = re.compile(CJK_PATTERN)
+
+        # 标点和关键词的字符合并成一个字符集，一次扫描完成
+        feature_chars = ''.join(sorted(set(punctuation).union(*self.keywords)))
+        self._feature_re = re.compile('[' + re.escape(feature_chars) + ']') if feature_chars else None
+
+        # 跳过词按整词匹配（前后不能紧接英文字母或数字），长词优先
+        self._skip_re = None
+        if self.skip_terms:
+            terms = '|'.join(re.escape(term)
+                             for term in sorted(set(self.skip_terms), key=len, reverse=True))
+            self._skip_re = re.compile(r'(?<![A-Za-z0-9])(?:' + terms + r')(?![A-Za-z0-9])')
+
+        if cache_size:
+            self.should_translate = lru_cache(maxsize=cache_size)(self.classify)
+        else:
+            self.should_translate = self.classify
+
+    def classify(self, text: str) -> bool:
+        """
+        判断文本是否需要翻译（不使用缓存）
+
+        Args:
+            text: 待判断的文本
+
+        Returns:
+            True表示需要翻译，False表示跳过
+        """
+        # 跳过纯数字
+        if text.isdigit():
+            return False
+
+        # 去掉跳过列表中的词，剩下的部分再判断
+        if self._skip_re is not None:
+            text = self._skip_re.sub(' ', text)
+
+        # 检查是否包含中文（按删掉中文后的长度差计数，不构造匹配列表）
+        chinese_chars = len(text) - len(self._cjk_re.sub('', text))
+        if chinese_chars == 0:
+            return False
+
+        # 中文比例较低时，包含中文标点、时间单位或关键词仍然翻译
+        if chinese_chars / len(text) < self.min_cjk_ratio:
+            return self._feature_re is not None and self._feature_re.search(text) is not None
+
+        # 包含中文的文本需要翻译
+        return True
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        分类规则的摘要（规则变化时，之前按旧规则生成的结果不应再复用）
+
+        Returns:
+            16位十六进制摘要
+        """
+        config = {
+            'min_cjk_ratio': self.min_cjk_ratio,
+            'keywords': sorted(set(self.keywords)),
+            'punctuation': ''.join(sorted(set(self.punctuation))),
+            'skip_terms': sorted(set(self.skip_terms))
+        }
+        payload = json.dumps(config, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def cache_info(self):
+        """
+        获取缓存命中统计
+
+        Returns:
+            functools的CacheInfo，未启用缓存时返回None
+        """
+        cache_info = getattr(self.should_translate, 'cache_info', None)
+        return cache_info() if cache_info else None
+
+
+def classifier_from_env() -> TextClassifier:
+    """
+    按环境变量创建文本分类器
+
+    - TRANSLATE_MIN_CJK_RATIO: 中文比例阈值（默认0.2）
+    - TRANSLATE_KEYWORDS: 逗号分隔的关键词，设置后替换默认关键词
+    - TRANSLATE_SKIP_TERMS: 逗号分隔的跳过词
+    - TRANSLATE_SKIP_FILE: 跳过词文件（每行一个），与 TRANSLATE_SKIP_TERMS 合并
+
+    Returns:
+        文本分类器实例
+    """
+    keywords = _split_list(os.getenv('TRANSLATE_KEYWORDS')) or DEFAULT_KEYWORDS
+    skip_terms = _split_list(os.getenv('TRANSLATE_SKIP_TERMS'))
+    skip_file = os.getenv('TRANSLATE_SKIP_FILE')
+    if skip_file:
+        skip_terms += load_terms(skip_file)
+
+    return TextClassifier(
+        min_cjk_ratio=float(os.getenv('TRANSLATE_MIN_CJK_RATIO', str(DEFAULT_MIN_CJK_RATIO))),
+        keywords=keywords,
+        skip_terms=skip_terms
+    )
+
+
+_default_classifier = None
+_default_classifier_lock = threading.Lock()
+
+
+def get_text_classifier() -> TextClassifier:
+    """
+    获取进程内共享的文本分类器（按环境变量配置）
+
+    Returns:
+        文本分类器实例
+    """
+    global _default_classifier
+
+    if _default_classifier is None:
+        with _default_classifier_lock:
+            if _default_classifier is None:
+                _default_classifier = classifier_from_env()
+    return _default_classifier
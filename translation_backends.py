@@ -0,0 +1,366 @@
+"""
+翻译后端模块 - 聊天补全接口的可插拔实现
+DeepSeekBackend 调用真实API；MockBackend 为本地确定性模拟引擎，用于离线压测
+两个后端都支持流式补全（stream），边接收边返回文本片段
+"""
+import os
+import json
+import time
+import random
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+
+from batch_planner import estimate_tokens
+from request_scheduler import RetryableError
+from http_pool import get_http_client
+
+
+class CompletionResult:
+    """补全结果类"""
+
+    def __init__(self, content: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """
+        初始化补全结果
+
+        Args:
+            content: 模型返回的文本
+            prompt_tokens: 输入token数
+            completion_tokens: 输出token数
+        """
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        """总token数"""
+        return self.prompt_tokens + self.completion_tokens
+
+
+class StreamingCompletion(CompletionResult):
+    """
+    流式补全结果类
+
+    迭代得到模型逐步返回的文本片段；迭代结束后 content 和token数才完整。
+    """
+
+    def __init__(self, chunks: Iterable[Tuple[str, Optional[object]]]):
+        """
+        初始化流式补全结果
+
+        Args:
+            chunks: (文本片段, usage) 序列，usage为带 prompt_tokens/completion_tokens 的对象或None
+        """
+        super().__init__('')
+        self._chunks = chunks
+        self._parts = []
+
+    def __iter__(self) -> Iterator[str]:
+        for delta, usage in self._chunks:
+            if usage is not None:
+                self.prompt_tokens = usage.prompt_tokens or 0
+                self.completion_tokens = usage.completion_tokens or 0
+            if delta:
+                self._parts.append(delta)
+                yield delta
+        self.content = ''.join(self._parts).strip()
+
+
+class TranslationBackend:
+    """翻译后端基类"""
+
+    name = 'base'
+
+    def __init__(self, model: str):
+        """
+        初始化后端
+
+        Args:
+            model: 模型名称（参与翻译记忆库的缓存键）
+        """
+        self.model = model
+
+    def complete(self, messages: List[Dict], timeout: Optional[float] = None,
+                 json_mode: bool = False) -> CompletionResult:
+        """
+        执行一次聊天补全
+
+        Args:
+            messages: 消息列表
+            timeout: 请求超时（秒）
+            json_mode: 是否要求返回JSON对象
+
+        Returns:
+            补全结果
+        """
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict], timeout: Optional[float] = None,
+               json_mode: bool = False) -> StreamingCompletion:
+        """
+        执行一次流式聊天补全（默认实现：完整补全后作为一个片段返回）
+
+        Args:
+            messages: 消息列表
+            timeout: 请求超时（秒）
+            json_mode: 是否要求返回JSON对象
+
+        Returns:
+            流式补全结果，迭代得到文本片段
+        """
+        completion = self.complete(messages, timeout=timeout, json_mode=json_mode)
+        return StreamingCompletion([(completion.content, completion)])
+
+
+class DeepSeekBackend(TranslationBackend):
+    """DeepSeek后端 - 通过OpenAI兼容接口调用"""
+
+    name = 'deepseek'
+
+    def __init__(self, model: str = "deepseek-v3.2", http_client: Optional[httpx.Client] = None):
+        """
+        初始化DeepSeek后端
+
+        Args:
+            model: 模型名称
+            http_client: httpx客户端，默认使用进程内共享的连接池
+        """
+        super().__init__(model)
+
+        # DeepSeek API配置
+        api_key = os.getenv('DEEPSEEK_API_KEY')
+        if not api_key:
+            raise ValueError("请设置 DEEPSEEK_API_KEY 环境变量")
+
+        # DeepSeek API endpoint - 使用最新V3.2版本
+        # base_url 不带 /v1，因为 OpenAI SDK 会自动添加 /v1/chat/completions
+        # 重试由请求调度器统一处理，关闭SDK自带的重试
+        # 连接池在进程内共享，新任务复用已建立的keep-alive连接
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url="https://api.deepseek.com",
+            max_retries=0,
+            http_client=http_client or get_http_client()
+        )
+
+    def complete(self, messages: List[Dict], timeout: Optional[float] = None,
+                 json_mode: bool = False) -> CompletionResult:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            **self._request_options(timeout, json_mode)
+        )
+
+        usage = response.usage
+        return CompletionResult(
+            (response.choices[0].message.content or '').strip(),
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+
+    def stream(self, messages: List[Dict], timeout: Optional[float] = None,
+               json_mode: bool = False) -> StreamingCompletion:
+        # include_usage 让最后一个数据块携带token用量（用于token限流修正和 /metrics）
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            stream=True,
+            extra_body={"stream_options": {"include_usage": True}},
+            **self._request_options(timeout, json_mode)
+        )
+        return StreamingCompletion(self._iter_chunks(response))
+
+    @staticmethod
+    def _request_options(timeout: Optional[float], json_mode: bool) -> Dict:
+        """请求参数：JSON模式和超时（流式请求中超时作用于每次读取）"""
+        kwargs = {}
+        if json_mode:
+            kwargs['response_format'] = {"type": "json_object"}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        return kwargs
+
+    @staticmethod
+    def _iter_chunks(response) -> Iterator[Tuple[str, Optional[object]]]:
+        """逐个读取数据块；读取中途断开按可重试错误抛出，由请求调度器重发整个请求"""
+        try:
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                usage = getattr(chunk, 'usage', None)
+                if isinstance(usage, dict):
+                    # 旧版SDK的数据块模型没有usage字段，原样保留为字典
+                    usage = CompletionResult('', usage.get('prompt_tokens') or 0,
+                                             usage.get('completion_tokens') or 0)
+                yield delta or '', usage
+        except httpx.TransportError as e:
+            raise RetryableError(f"流式响应中断: {e}") from e
+        finally:
+            response.response.close()
+
+
+class MockBackend(TranslationBackend):
+    """
+    本地模拟后端 - 不访问网络
+
+    译文是确定性的（原文加 "[EN] " 前缀），延迟、抖动和错误率可配置，
+    错误以可重试错误抛出，和真实API的429/5xx走同样的重试路径。
+    流式补全把响应切成小片段，延迟平均分摊到各个片段上，模拟逐token返回。
+    """
+
+    name = 'mock'
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, seed: int = 0, chunk_chars: int = 16):
+        """
+        初始化模拟后端
+
+        Args:
+            latency_ms: 每次请求的基础延迟（毫秒）
+            jitter_ms: 延迟的随机抖动范围（毫秒）
+            error_rate: 请求失败的概率（0~1）
+            seed: 随机种子，相同种子的请求序列产生相同的延迟和错误
+            chunk_chars: 流式补全时每个片段的字符数
+        """
+        super().__init__('mock')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.chunk_chars = max(1, chunk_chars)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'MockBackend':
+        """
+        从环境变量创建模拟后端
+
+        Returns:
+            模拟后端实例
+        """
+        return cls(
+            latency_ms=float(os.getenv('MOCK_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('MOCK_JITTER_MS', '0')),
+            error_rate=float(os.getenv('MOCK_ERROR_RATE', '0')),
+            seed=int(os.getenv('MOCK_SEED', '0')),
+            chunk_chars=int(os.getenv('MOCK_STREAM_CHUNK_CHARS', '16'))
+        )
+
+    @staticmethod
+    def translate(text: str) -> str:
+        """
+        模拟翻译
+
+        Args:
+            text: 原文
+
+        Returns:
+            模拟译文
+        """
+        return f"[EN] {text}"
+
+    def complete(self, messages: List[Dict], timeout: Optional[float] = None,
+                 json_mode: bool = False) -> CompletionResult:
+        delay, failed = self._draw()
+        time.sleep(delay)
+
+        if failed:
+            raise RetryableError("模拟后端随机错误")
+        return self._respond(messages, json_mode)
+
+    def stream(self, messages: List[Dict], timeout: Optional[float] = None,
+               json_mode: bool = False) -> StreamingCompletion:
+        delay, failed = self._draw()
+        if failed:
+            time.sleep(delay)
+            raise RetryableError("模拟后端随机错误")
+
+        completion = self._respond(messages, json_mode)
+        content = completion.content
+        pieces = [content[i:i + self.chunk_chars]
+                  for i in range(0, len(content), self.chunk_chars)] or ['']
+
+        def chunks():
+            for piece in pieces:
+                time.sleep(delay / len(pieces))
+                yield piece, None
+            yield '', completion
+
+        return StreamingCompletion(chunks())
+
+    def _draw(self) -> Tuple[float, bool]:
+        """抽取本次请求的延迟（秒）和是否失败"""
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self._random.random() < self.error_rate
+        return max(0.0, delay) / 1000, failed
+
+    def _respond(self, messages: List[Dict], json_mode: bool) -> CompletionResult:
+        """生成模拟响应"""
+        prompt = messages[-1]['content']
+        if json_mode:
+            content = json.dumps({'translations': [
+                {'id': item['id'], 'text': self.translate(item['text'])}
+                for item in self._parse_items(prompt)
+            ]}, ensure_ascii=False)
+        else:
+            content = self.translate(prompt)
+
+        prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+        return CompletionResult(content, prompt_tokens=prompt_tokens,
+                                completion_tokens=estimate_tokens(content))
+
+    @staticmethod
+    def _parse_items(prompt: str) -> List[Dict]:
+        """从提示词中取出输入JSON里的文本条目"""
+        start = prompt.find('{"slides"')
+        if start < 0:
+            return []
+        data, _ = json.JSONDecoder().raw_decode(prompt[start:])
+        return [item for slide in data.get('slides', []) for item in slide.get('items', [])]
+
+
+def create_backend(name: Optional[str] = None) -> TranslationBackend:
+    """
+    按名称创建翻译后端
+
+    Args:
+        name: 后端名称（deepseek或mock），默认读取 TRANSLATION_BACKEND
+
+    Returns:
+        翻译后端实例
+    """
+    name = (name or os.getenv('TRANSLATION_BACKEND', 'deepseek')).lower()
+
+    if name == 'deepseek':
+        return DeepSeekBackend()
+    if name == 'mock':
+        return MockBackend.from_env()
+
+    raise ValueError(f"不支持的翻译后端: {name}")
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> TranslationBackend:
+    """
+    获取进程内共享的翻译后端（每个名称一个实例，共用同一个API客户端和连接池）
+
+    Args:
+        name: 后端名称（deepseek或mock），默认读取 TRANSLATION_BACKEND
+
+    Returns:
+        翻译后端实例
+    """
+    name = (name or os.getenv('TRANSLATION_BACKEND', 'deepseek')).lower()
+
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_backend(name)
+        return _backends[name]
@@ -0,0 +1,273 @@
+"""
+翻译记忆库 - 持久化缓存已翻译的文本
+以规范化原文、模型和提示词版本为键，存储在SQLite中
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional
+
+
+DEFAULT_DB_PATH = os.getenv('TRANSLATION_MEMORY_PATH', 'cache/translation_memory.db')
+DEFAULT_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '200000'))
+# 过期时间（秒），0表示永不过期
+DEFAULT_TTL = int(os.getenv('TRANSLATION_MEMORY_TTL', str(90 * 24 * 3600)))
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化原文：统一Unicode形式并合并空白
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        规范化后的文本
+    """
+    text = unicodedata.normalize('NFKC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class TranslationMemory:
+    """翻译记忆库类 - SQLite存储，支持LRU/TTL淘汰"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: int = DEFAULT_TTL):
+        """
+        初始化翻译记忆库
+
+        Args:
+            db_path: 数据库文件路径（':memory:' 表示仅内存）
+            max_entries: 最多保留的条目数，超出后按最近使用时间淘汰
+            ttl: 条目过期时间（秒），0表示永不过期
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if db_path != ':memory:':
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        # 多个翻译线程共享同一个连接，访问由锁串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,  -- 规范化后的原文
+                translation TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, prompt_version: str) -> str:
+        """
+        计算缓存键
+
+        Args:
+            text: 原文
+            model: 模型名称
+            prompt_version: 提示词版本
+
+        Returns:
+            缓存键（SHA-256十六进制）
+        """
+        raw = '\x00'.join([model, prompt_version, normalize_text(text)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: Iterable[str], model: str, prompt_version: str) -> Dict[str, str]:
+        """
+        批量查询翻译
+
+        Args:
+            texts: 原文列表
+            model: 模型名称
+            prompt_version: 提示词版本
+
+        Returns:
+            命中的翻译映射 {原文: 译文}，未命中的原文不在结果中
+        """
+        texts = list(dict.fromkeys(texts))
+        if not texts:
+            return {}
+
+        # 不同原文可能规范化为同一个键
+        keys = {}
+        for text in texts:
+            keys.setdefault(self.make_key(text, model, prompt_version), []).append(text)
+        now = time.time()
+        found = {}
+
+        with self._lock:
+            placeholders = ','.join('?' * len(keys))
+            rows = self._conn.execute(
+                f'SELECT key, translation, created_at FROM translations WHERE key IN ({placeholders})',
+                list(keys)
+            ).fetchall()
+
+            expired = []
+            for key, translation, created_at in rows:
+                if self.ttl and now - created_at > self.ttl:
+                    expired.append(key)
+                else:
+                    for text in keys[key]:
+                        found[text] = translation
+
+            if expired:
+                self._conn.executemany('DELETE FROM translations WHERE key = ?',
+                                       [(key,) for key in expired])
+            hit_keys = [key for key, key_texts in keys.items() if key_texts[0] in found]
+            if hit_keys:
+                self._conn.executemany('UPDATE translations SET last_used = ? WHERE key = ?',
+                                       [(now, key) for key in hit_keys])
+            if expired or hit_keys:
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+
+        return found
+
+    def put_many(self, translations: Dict[str, str], model: str, prompt_version: str):
+        """
+        批量写入翻译
+
+        Args:
+            translations: 翻译映射 {原文: 译文}
+            model: 模型名称
+            prompt_version: 提示词版本
+        """
+        if not translations:
+            return
+
+        now = time.time()
+        rows = [
+            (self.make_key(source, model, prompt_version), normalize_text(source), translation,
+             model, prompt_version, now, now)
+            for source, translation in translations.items()
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO translations '
+                '(key, source, translation, model, prompt_version, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """淘汰过期条目以及超出容量的最久未使用条目（调用方持有锁）"""
+        if self.ttl:
+            self._conn.execute('DELETE FROM translations WHERE created_at < ?',
+                               (time.time() - self.ttl,))
+
+        count = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                'DELETE FROM translations WHERE key IN '
+                '(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)',
+                (overflow,)
+            )
+
+    def invalidate(self, text: Optional[str] = None, model: Optional[str] = None,
+                   prompt_version: Optional[str] = None) -> int:
+        """
+        使缓存条目失效
+
+        不带参数时清空整个记忆库；指定text时删除该原文（可再按模型/提示词版本过滤）。
+
+        Args:
+            text: 原文
+            model: 模型名称
+            prompt_version: 提示词版本
+
+        Returns:
+            删除的条目数
+        """
+        conditions = []
+        params = []
+        if text is not None:
+            conditions.append('source = ?')
+            params.append(normalize_text(text))
+        if model is not None:
+            conditions.append('model = ?')
+            params.append(model)
+        if prompt_version is not None:
+            conditions.append('prompt_version = ?')
+            params.append(prompt_version)
+
+        sql = 'DELETE FROM translations'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """
+        获取统计信息
+
+        Returns:
+            包含条目数、命中数、未命中数和命中率的字典
+        """
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_default_memory = None
+_default_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """
+    获取进程内共享的翻译记忆库
+
+    设置 TRANSLATION_MEMORY_ENABLED=0 可关闭缓存。
+
+    Returns:
+        翻译记忆库实例，关闭时返回None
+    """
+    global _default_memory
+
+    if os.getenv('TRANSLATION_MEMORY_ENABLED', '1') == '0':
+        return None
+
+    with _default_memory_lock:
+        if _default_memory is None:
+            _default_memory = TranslationMemory()
+        return _default_memory
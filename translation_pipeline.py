@@ -0,0 +1,289 @@
+"""
+翻译流水线 - 负责把提取的文本送去翻译并回填到PPT
+整份PPT先去重，按token预算打包成批量请求并发发送，结果按幻灯片顺序回填
+"""
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Optional, Callable, Tuple, Set
+
+from ppt_processor import PPTProcessor
+from translator import Translator, ItemCallback
+from batch_planner import plan_batches, DEFAULT_TOKEN_BUDGET
+from slide_store import SlideStore
+
+
+# 同时在途的翻译请求上限
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv('TRANSLATE_MAX_IN_FLIGHT', '8'))
+# 等待翻译结果时检查取消标志的间隔（秒）
+CANCEL_POLL_INTERVAL = 0.5
+
+
+class TranslationCancelled(Exception):
+    """翻译被调用方取消"""
+
+
+@contextmanager
+def request_executor(max_in_flight: int):
+    """
+    发送翻译请求的线程池
+
+    正常结束或出错时等待进行中的请求结束；被取消时不等待（请求在后台结束，结果丢弃），
+    任务可以立即记录cancelled状态，平滑关闭不会因为慢请求超过强制结束的时间
+
+    Args:
+        max_in_flight: 同时在途的请求上限
+
+    Yields:
+        线程池
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight))
+    cancelled = False
+    try:
+        yield executor
+    except TranslationCancelled:
+        cancelled = True
+        raise
+    finally:
+        executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+
+
+def wait_result(future: Future, cancel_event: Optional[threading.Event] = None):
+    """
+    等待请求结果，期间定期检查取消标志
+
+    Args:
+        future: 翻译请求
+        cancel_event: 取消标志，设置后抛出TranslationCancelled
+
+    Returns:
+        请求结果
+    """
+    if cancel_event is not None:
+        while not future.done():
+            if cancel_event.is_set():
+                raise TranslationCancelled("翻译已取消")
+            wait([future], timeout=CANCEL_POLL_INTERVAL)
+    return future.result()
+
+
+def plan_deck_requests(processor: PPTProcessor, slides_data: List[Dict],
+                       known: Optional[Set[str]] = None) -> Tuple[List[Tuple[int, List[str]]], Dict]:
+    """
+    整份PPT去重，规划每张幻灯片需要发送的文本
+
+    每个不同的文本只归属于第一次出现的幻灯片（作为代表上下文），
+    后续幻灯片中的相同文本复用该翻译结果。
+
+    Args:
+        processor: PPT处理器（已调用extract_texts）
+        slides_data: extract_texts的返回值
+        known: 已有译文的文本（不再发送）
+
+    Returns:
+        (请求列表 [(幻灯片索引, 需要翻译的文本列表)], 去重统计)
+    """
+    requests = []
+    seen = set()
+    known = known or set()
+    strings_total = 0
+
+    for slide_data in slides_data:
+        slide_index = slide_data['slide_index']
+        slide_texts = processor.get_slide_texts(slide_index)
+        strings_total += len(slide_texts)
+
+        owned_texts = [text for text in slide_texts if text not in seen]
+        seen.update(owned_texts)
+        requests.append((slide_index, [text for text in owned_texts if text not in known]))
+
+    stats = {
+        'strings_total': strings_total,
+        'strings_unique': len(seen),
+        # 去重节省的比例：0表示没有重复，越接近1节省越多
+        'dedup_ratio': round(1 - len(seen) / strings_total, 4) if strings_total else 0.0
+    }
+    return requests, stats
+
+
+def reuse_slides(translator: Translator, slides_data: List[Dict],
+                 slide_store: SlideStore) -> Tuple[Dict[str, str], int]:
+    """
+    按幻灯片指纹取出之前的译文
+
+    Args:
+        translator: 翻译器（提供影响译文的设置）
+        slides_data: extract_texts的返回值
+        slide_store: 幻灯片指纹存储
+
+    Returns:
+        (已有译文 {原文: 译文}, 全部文本都有译文的幻灯片数)
+    """
+    known = {}
+    slides_reused = 0
+
+    for slide_data in slides_data:
+        previous = slide_store.lookup(translator.settings, slide_data['fingerprint'])
+        if not previous:
+            continue
+        known.update(previous)
+        if all(unit['text'] in previous for unit in slide_data['texts']):
+            slides_reused += 1
+
+    return known, slides_reused
+
+
+def translate_presentation(processor: PPTProcessor, translator: Translator,
+                           slides_data: List[Dict],
+                           max_in_flight: Optional[int] = None,
+                           progress_callback: Optional[Callable[[int, int], None]] = None,
+                           token_budget: Optional[int] = None,
+                           slide_store: Optional[SlideStore] = None,
+                           result_id: Optional[str] = None,
+                           batch_callback: Optional[Callable[[Dict[int, Dict[str, str]]], None]] = None,
+                           cancel_event: Optional[threading.Event] = None,
+                           item_callback: Optional[ItemCallback] = None) -> Dict:
+    """
+    并发翻译所有幻灯片，并按幻灯片顺序回填
+
+    相同文本在整份PPT中只翻译一次，结果回填到所有出现的位置。
+    文本少的幻灯片按token预算合并到同一个请求，文本多的幻灯片拆分到多个请求。
+    翻译请求在线程池中并发执行（最多max_in_flight个同时在途），
+    回填只在调用线程中进行，因为python-pptx对象不是线程安全的：等待请求期间，
+    已就绪的译文（流式模式下逐条到达）立即写入对应的文本单元，
+    幻灯片仍按顺序在其全部文本就绪后计入进度。
+
+    Args:
+        processor: PPT处理器（已调用extract_texts）
+        translator: 翻译器
+        slides_data: extract_texts的返回值
+        max_in_flight: 同时在途的请求上限，默认读取 TRANSLATE_MAX_IN_FLIGHT
+        progress_callback: 进度回调，每回填完一张幻灯片调用一次 (已完成数, 总数)
+        token_budget: 每个请求的token预算，默认读取 TRANSLATE_BATCH_TOKEN_BUDGET
+        slide_store: 幻灯片指纹存储，指纹未变的幻灯片直接复用之前的译文，只发送有变化的文本
+        result_id: 输出文件ID，提供时在输出文件旁保存本次的幻灯片指纹
+        batch_callback: 每个请求完成时立即调用（在请求线程中，不等待按顺序回填），
+                        参数为 {幻灯片索引: {原文: 译文}}
+        cancel_event: 取消标志，设置后取消尚未开始的请求并抛出TranslationCancelled（不等待进行中的请求）
+        item_callback: 每条译文就绪时立即调用（在请求线程中），参数为 (幻灯片索引, 原文, 译文)
+
+    Returns:
+        统计信息字典：slides_processed, slides_reused, strings_total, strings_unique,
+        dedup_ratio, requests, items_failed（重试后仍翻译失败、保留原文的不同文本数）
+    """
+    deck_map = {}
+    slides_reused = 0
+    if slide_store:
+        deck_map, slides_reused = reuse_slides(translator, slides_data, slide_store)
+
+    # 先在当前线程规划请求（来自extract_texts的文本单元表），避免工作线程访问PPT对象
+    requests, stats = plan_deck_requests(processor, slides_data, set(deck_map))
+    batches = plan_batches(requests, token_budget or DEFAULT_TOKEN_BUDGET)
+    stats['slides_processed'] = len(slides_data)
+    stats['slides_reused'] = slides_reused
+    stats['requests'] = len(batches)
+
+    max_in_flight = max_in_flight or DEFAULT_MAX_IN_FLIGHT
+    slide_order = [slide_index for slide_index, _ in requests]
+    total = len(slide_order)
+    applied = 0
+
+    # 请求线程交出的译文 (原文, 译文)；None表示有请求结束
+    ready = queue.SimpleQueue()
+    # 尚未回填的文本单元 {原文: [单元]}，以及已经单独回填过的单元
+    slide_units = {slide_data['slide_index']: slide_data['texts'] for slide_data in slides_data}
+    pending_units = {}
+    for units in slide_units.values():
+        for unit in units:
+            pending_units.setdefault(unit['text'], []).append(unit)
+    written = set()
+    # 重试后仍翻译失败、保留原文的文本（由请求线程写入）
+    failed = set()
+
+    def on_item(slide_index: int, text: str, translated_text: str):
+        ready.put((text, translated_text))
+        if item_callback:
+            item_callback(slide_index, text, translated_text)
+
+    def write_item(text: str, translated_text: str):
+        """立即回填一条译文的所有出现位置"""
+        for unit in pending_units.pop(text, ()):
+            if id(unit) not in written:
+                processor.apply_translation(unit, translated_text)
+                written.add(id(unit))
+
+    def wait_writing(future: Future):
+        """等待请求结果，期间回填已就绪的译文并检查取消标志"""
+        while not future.done():
+            if cancel_event is not None and cancel_event.is_set():
+                raise TranslationCancelled("翻译已取消")
+            try:
+                entry = ready.get(timeout=CANCEL_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if entry is not None:
+                write_item(*entry)
+        # 请求的条目都在它结束之前放入队列
+        while True:
+            try:
+                entry = ready.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                write_item(*entry)
+        return future.result()
+
+    def apply_until(boundary: Optional[int]):
+        """回填索引小于boundary的所有幻灯片（None表示全部）"""
+        nonlocal applied
+        while applied < total and (boundary is None or slide_order[applied] < boundary):
+            slide_index = slide_order[applied]
+            processor.apply_slide_translations(slide_index, deck_map, skip=written)
+            written.update(id(unit) for unit in slide_units.get(slide_index, []))
+            applied += 1
+            if progress_callback:
+                progress_callback(applied, total)
+
+    with request_executor(max_in_flight) as executor:
+        futures = [executor.submit(translator.translate_batch, batch, on_item, failed)
+                   for batch in batches]
+        for future in futures:
+            future.add_done_callback(lambda _: ready.put(None))
+        if batch_callback:
+            def report(done: Future):
+                if not done.cancelled() and done.exception() is None:
+                    batch_callback(done.result())
+            
+            for future in futures:
+                future.add_done_callback(report)
+
+        try:
+            # 按请求顺序等待结果并回填。幻灯片中的文本只可能归属于它自己或之前的幻灯片，
+            # 所以下一个请求开始之前的幻灯片此时都已就绪；被拆分的幻灯片等最后一段完成后回填
+            for i, future in enumerate(futures):
+                for slide_map in wait_writing(future).values():
+                    deck_map.update(slide_map)
+                next_start = batches[i + 1][0][0] if i + 1 < len(batches) else None
+                apply_until(next_start)
+            apply_until(None)
+        except Exception:
+            # 任一请求失败或被取消时取消尚未开始的请求
+            for future in futures:
+                future.cancel()
+            raise
+
+    if slide_store and result_id:
+        # 只记录真正翻译成功的文本（失败时保留的原文下次重新翻译）
+        slide_store.save(result_id, translator.settings, {
+            slide_data['fingerprint']: {
+                unit['text']: deck_map[unit['text']] for unit in slide_data['texts']
+                if deck_map.get(unit['text'], unit['text']) != unit['text']
+                and unit['text'] not in failed
+            }
+            for slide_data in slides_data
+        })
+
+    stats['items_failed'] = len(failed)
+    return stats
@@ -1,34 +1,67 @@
 """
 翻译模块 - 负责AI翻译功能
-使用DeepSeek API
+默认使用DeepSeek API，后端可通过 TRANSLATION_BACKEND 切换
 """
 import os
-from typing import List, Dict
-from openai import OpenAI
+import re
+import json
+import time
+import threading
+from typing import Callable, List, Dict, Optional, Set, Tuple
 from dotenv import load_dotenv
+from translation_memory import TranslationMemory, get_translation_memory
+from request_scheduler import RequestScheduler, get_request_scheduler
+from batch_planner import estimate_tokens
+from translation_backends import TranslationBackend, StreamingCompletion, get_backend
+from json_stream import TranslationItemParser
+from text_classifier import get_text_classifier
+from metrics import API_FIRST_ITEM_DURATION, API_REQUEST_DURATION, API_REQUESTS, API_TOKENS
 
 load_dotenv()
 
+# 提示词版本，修改 _build_prompt 或解析规则时需要同步更新，使翻译记忆库中的旧条目失效
+PROMPT_VERSION = 'v3-json'
+
+# 1表示使用流式补全：边接收边解析，每条译文完成时立即交给条目回调
+DEFAULT_STREAMING = os.getenv('TRANSLATE_STREAMING', '0') == '1'
+
+# 条目回调：(幻灯片索引, 原文, 译文)，在请求线程中调用
+ItemCallback = Callable[[int, str, str], None]
+
 
 class Translator:
-    """翻译器类 - 使用DeepSeek API"""
+    """翻译器类 - 提示词构建、结果解析和缓存，API调用交给翻译后端"""
     
-    def __init__(self):
+    def __init__(self, memory: Optional[TranslationMemory] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 backend: Optional[TranslationBackend] = None,
+                 streaming: Optional[bool] = None):
         """
         初始化翻译器
+        
+        Args:
+            memory: 翻译记忆库，默认使用进程内共享的记忆库
+            scheduler: 请求调度器（限流、超时、重试），默认使用进程内共享的调度器
+            backend: 翻译后端，默认使用进程内共享的后端（按 TRANSLATION_BACKEND 选择deepseek或mock）
+            streaming: 是否使用流式补全，默认读取 TRANSLATE_STREAMING
         """
-        # DeepSeek API配置
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        if not api_key:
-            raise ValueError("请设置 DEEPSEEK_API_KEY 环境变量")
-        
-        # DeepSeek API endpoint - 使用最新V3.2版本
-        # base_url 不带 /v1，因为 OpenAI SDK 会自动添加 /v1/chat/completions
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com"
-        )
-        self.model = "deepseek-v3.2"  # 使用最新 V3.2 模型
+        self.backend = backend or get_backend()
+        self.model = self.backend.model
+        self.memory = memory if memory is not None else get_translation_memory()
+        self.scheduler = scheduler or get_request_scheduler()
+        # 缺失或无效的条目单独重试的轮数
+        self.max_item_retries = int(os.getenv('TRANSLATE_ITEM_RETRIES', '2'))
+        self.streaming = DEFAULT_STREAMING if streaming is None else streaming
+    
+    @property
+    def settings(self) -> Dict[str, str]:
+        """影响译文的设置（用于结果缓存键和幻灯片指纹存储），包括决定哪些文本需要翻译的分类规则"""
+        return {
+            'backend': self.backend.name,
+            'model': self.model,
+            'prompt_version': PROMPT_VERSION,
+            'classifier': get_text_classifier().fingerprint
+        }
     
     def translate_slide(self, texts: List[str], slide_index: int) -> Dict[str, str]:
         """
@@ -44,112 +77,340 @@ class Translator:
         if not texts:
             return {}
         
-        # 构建提示词
-        prompt = self._build_prompt(texts, slide_index)
+        return self.translate_batch([(slide_index, texts)]).get(slide_index, {})
+    
+    def translate_batch(self, sections: List[Tuple[int, List[str]]],
+                        item_callback: Optional[ItemCallback] = None,
+                        failed: Optional[Set[str]] = None) -> Dict[int, Dict[str, str]]:
+        """
+        在一次请求中翻译多张幻灯片的文本
         
-        # 调用API
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional scientific presentation translator. Translate Chinese text into natural, concise English used in PowerPoint slides."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3
-        )
+        每张幻灯片在提示词中是独立的分段，上下文互不混合。
         
-        # 解析响应
-        translated_text = response.choices[0].message.content.strip()
+        Args:
+            sections: 幻灯片分段列表 [(幻灯片索引, 文本列表)]
+            item_callback: 每条译文就绪时调用 (幻灯片索引, 原文, 译文)：记忆库命中的立即调用，
+                           流式模式下模型返回的条目一解析出来就调用，否则在响应完整后调用
+            failed: 提供时加入重试后仍翻译失败的原文（结果中这些文本保留原文）
+            
+        Returns:
+            按幻灯片拆分的翻译映射 {幻灯片索引: {原文: 译文}}
+        """
+        all_texts = [text for _, texts in sections for text in texts]
+        if not all_texts:
+            return {}
+        
+        # 先查翻译记忆库，只把未命中的文本发给模型
+        cached = {}
+        if self.memory is not None:
+            cached = self.memory.get_many(all_texts, self.model, PROMPT_VERSION)
+        
+        missing_sections = []
+        requested = set()
+        reported = set()
+        for slide_index, texts in sections:
+            missing = [text for text in dict.fromkeys(texts)
+                       if text not in cached and text not in requested]
+            requested.update(missing)
+            if missing:
+                missing_sections.append((slide_index, missing))
+            if item_callback:
+                for text in dict.fromkeys(texts):
+                    if text in cached and text not in reported:
+                        reported.add(text)
+                        item_callback(slide_index, text, cached[text])
+        
+        translated = dict(cached)
+        if missing_sections:
+            translated.update(self._request_translations(missing_sections, item_callback, failed))
+        
+        # 按幻灯片拆分结果
+        results = {}
+        for slide_index, texts in sections:
+            slide_map = results.setdefault(slide_index, {})
+            for text in texts:
+                if text in translated:
+                    slide_map[text] = translated[text]
+        return results
+    
+    def _request_translations(self, sections: List[Tuple[int, List[str]]],
+                              item_callback: Optional[ItemCallback] = None,
+                              failed: Optional[Set[str]] = None) -> Dict[str, str]:
+        """
+        调用API翻译文本，并写入翻译记忆库
         
-        # 解析翻译结果
-        translated_lines = self._parse_translation_result(translated_text, texts)
+        每条文本带有编号id，模型按id返回JSON结果。缺失或无效的id只重发对应的文本，
+        重试后仍失败的文本保留原文（不写入记忆库，也不调用条目回调）。
         
-        # 创建映射字典
+        Args:
+            sections: 幻灯片分段列表 [(幻灯片索引, 待翻译的文本列表)]
+            item_callback: 每条译文就绪时调用 (幻灯片索引, 原文, 译文)
+            failed: 提供时加入翻译失败（保留原文）的文本
+            
+        Returns:
+            翻译映射字典 {原文: 译文}
+        """
         translation_map = {}
-        for i, original in enumerate(texts):
-            if i < len(translated_lines):
-                translation_map[original] = translated_lines[i]
+        pending = sections
+        
+        for attempt in range(self.max_item_retries + 1):
+            # 为本次请求的文本分配id
+            id_sections = []
+            id_to_text = {}
+            id_to_slide = {}
+            for slide_index, texts in pending:
+                items = []
+                for text in texts:
+                    item_id = str(len(id_to_text) + 1)
+                    id_to_text[item_id] = text
+                    id_to_slide[item_id] = slide_index
+                    items.append((item_id, text))
+                id_sections.append((slide_index, items))
+            
+            def on_item(item_id: str, translated_text: str):
+                if item_callback:
+                    item_callback(id_to_slide[item_id], id_to_text[item_id], translated_text)
+            
+            prompt = self._build_prompt(id_sections)
+            if self.streaming:
+                translated = self._complete_streaming(prompt, list(id_to_text), on_item)
             else:
-                # 如果行数不匹配，使用最后一个翻译结果
-                translation_map[original] = translated_lines[-1] if translated_lines else original
+                translated = self._parse_translation_result(self._complete(prompt), list(id_to_text))
+                for item_id, translated_text in translated.items():
+                    on_item(item_id, translated_text)
+            
+            batch_map = {id_to_text[item_id]: text for item_id, text in translated.items()}
+            translation_map.update(batch_map)
+            if self.memory is not None:
+                self.memory.put_many(batch_map, self.model, PROMPT_VERSION)
+            
+            # 只保留缺失的文本进入下一轮
+            pending = [(slide_index, [text for _, text in items if text not in translation_map])
+                       for slide_index, items in id_sections]
+            pending = [(slide_index, texts) for slide_index, texts in pending if texts]
+            if not pending:
+                break
+        
+        for slide_index, texts in pending:
+            print(f"⚠️  幻灯片 {slide_index + 1} 有 {len(texts)} 条文本翻译失败，保留原文")
+            for text in texts:
+                translation_map[text] = text
+            if failed is not None:
+                failed.update(texts)
         
         return translation_map
     
-    def _parse_translation_result(self, result: str, original_texts: List[str]) -> List[str]:
+    def _complete(self, prompt: str) -> str:
         """
-        解析翻译结果
+        调用翻译后端（JSON模式）
         
         Args:
-            result: API返回的翻译结果
-            original_texts: 原始文本列表
+            prompt: 用户提示词
             
         Returns:
-            翻译后的文本列表
+            模型返回的文本
+        """
+        return self._create_completion(self._translation_messages(prompt), json_mode=True).content
+    
+    def _complete_streaming(self, prompt: str, item_ids: List[str],
+                            on_item: Callable[[str, str], None]) -> Dict[str, str]:
+        """
+        以流式补全调用翻译后端（JSON模式），边接收边解析
+        
+        translations 数组中的每个对象一闭合就校验并交给on_item，不等待响应结束。
+        请求中途失败时由调度器整体重发，已交出的条目不再重复；
+        响应结束后再完整解析一次，补上增量解析没有取到的条目。
+        
+        Args:
+            prompt: 用户提示词
+            item_ids: 本次请求的文本id列表
+            on_item: 每条有效译文解析出来时调用 (id, 译文)
+            
+        Returns:
+            有效的翻译 {id: 译文}
+        """
+        expected = set(item_ids)
+        translated = {}
+        started = time.perf_counter()
+        
+        def accept(entry) -> bool:
+            item_id = self._accept_entry(entry, expected, translated)
+            if item_id is None:
+                return False
+            if len(translated) == 1:
+                API_FIRST_ITEM_DURATION.observe(time.perf_counter() - started, backend=self.backend.name)
+            on_item(item_id, translated[item_id])
+            return True
+        
+        def consume(completion: StreamingCompletion):
+            # 每次尝试（包括重试）从头解析
+            parser = TranslationItemParser()
+            for delta in completion:
+                for entry in parser.feed(delta):
+                    accept(entry)
+        
+        result = self._create_completion(self._translation_messages(prompt), json_mode=True,
+                                         stream_handler=consume)
+        for item_id, text in self._parse_translation_result(result.content, item_ids).items():
+            accept({'id': item_id, 'text': text})
+        
+        return translated
+    
+    @staticmethod
+    def _translation_messages(prompt: str) -> List[Dict]:
+        """翻译请求的消息列表"""
+        return [
+            {
+                "role": "system",
+                "content": "You are a professional scientific presentation translator. Translate Chinese text into natural, concise English used in PowerPoint slides."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _create_completion(self, messages: List[Dict], json_mode: bool = False,
+                           stream_handler: Optional[Callable[[StreamingCompletion], None]] = None):
         """
-        lines = []
+        通过请求调度器调用翻译后端（限流、超时、重试）
         
-        # 移除可能的编号前缀（如 "1. ", "2. " 等）
-        for line in result.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
+        Args:
+            messages: 消息列表
+            json_mode: 是否要求返回JSON对象
+            stream_handler: 提供时使用流式补全，在同一次尝试中消费全部文本片段
+                            （读取中途失败的重试也会重新调用）
             
-            # 移除编号前缀
-            if line and line[0].isdigit():
-                # 匹配 "1. ", "2. " 等格式
-                import re
-                line = re.sub(r'^\d+\.\s*', '', line)
+        Returns:
+            补全结果（CompletionResult，流式时为消费完毕的StreamingCompletion）
+        """
+        # 预估token：输入 + 与输入相当的输出
+        estimated = 2 * sum(estimate_tokens(message['content']) for message in messages)
+        
+        backend = self.backend.name
+        
+        def attempt(timeout: float):
+            # 每次尝试（包括重试）单独计时和计数
+            with API_REQUEST_DURATION.time(backend=backend):
+                try:
+                    if stream_handler is None:
+                        completion = self.backend.complete(messages, timeout=timeout, json_mode=json_mode)
+                    else:
+                        completion = self.backend.stream(messages, timeout=timeout, json_mode=json_mode)
+                        stream_handler(completion)
+                except Exception:
+                    API_REQUESTS.inc(backend=backend, outcome='error')
+                    raise
+            API_REQUESTS.inc(backend=backend, outcome='success')
+            return completion
+        
+        result = self.scheduler.call(attempt, estimated_tokens=estimated)
+        
+        API_TOKENS.inc(result.prompt_tokens, backend=backend, type='prompt')
+        API_TOKENS.inc(result.completion_tokens, backend=backend, type='completion')
+        if result.total_tokens:
+            self.scheduler.record_usage(result.total_tokens, estimated)
+        
+        return result
+    
+    def _parse_translation_result(self, result: str, item_ids: List[str]) -> Dict[str, str]:
+        """
+        解析JSON格式的翻译结果
+        
+        期望格式：{"translations": [{"id": "1", "text": "..."}]}
+        未知id、重复id、空译文都视为无效，不计入结果。
+        
+        Args:
+            result: API返回的翻译结果
+            item_ids: 本次请求的文本id列表
             
-            lines.append(line)
+        Returns:
+            有效的翻译 {id: 译文}
+        """
+        # 兼容模型用代码块包裹JSON的情况
+        result = re.sub(r'^```(?:json)?\s*|\s*```$', '', result.strip())
+        
+        try:
+            data = json.loads(result)
+        except json.JSONDecodeError:
+            return {}
         
-        # 如果行数匹配，直接返回
-        if len(lines) == len(original_texts):
-            return lines
+        entries = data.get('translations') if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            return {}
         
-        # 如果只有一行，可能是所有文本合并翻译了
-        if len(lines) == 1 and len(original_texts) > 1:
-            # 尝试按句号分割
-            sentences = [s.strip() for s in lines[0].split('.') if s.strip()]
-            if len(sentences) == len(original_texts):
-                return sentences
+        expected = set(item_ids)
+        translated = {}
+        for entry in entries:
+            self._accept_entry(entry, expected, translated)
         
-        # 如果还是不匹配，返回解析出的行（可能不完整）
-        return lines if lines else original_texts
+        return translated
     
-    def _build_prompt(self, texts: List[str], slide_index: int) -> str:
+    @staticmethod
+    def _accept_entry(entry, expected: set, translated: Dict[str, str]) -> Optional[str]:
+        """
+        校验一个翻译条目，有效时写入translated
+        
+        Args:
+            entry: 模型返回的条目
+            expected: 本次请求的id集合
+            translated: 已接受的翻译 {id: 译文}（同一id只接受第一次）
+            
+        Returns:
+            接受的id，无效时返回None
+        """
+        if not isinstance(entry, dict):
+            return None
+        item_id = str(entry.get('id', ''))
+        text = entry.get('text')
+        if item_id in expected and item_id not in translated \
+                and isinstance(text, str) and text.strip():
+            translated[item_id] = text.strip()
+            return item_id
+        return None
+    
+    def _build_prompt(self, sections: List[Tuple[int, List[Tuple[str, str]]]]) -> str:
         """
         构建翻译提示词
         
         Args:
-            texts: 文本列表
-            slide_index: 幻灯片索引
+            sections: 幻灯片分段列表 [(幻灯片索引, [(id, 文本)])]
             
         Returns:
             提示词字符串
         """
-        texts_str = '\n'.join([f"{i+1}. {text}" for i, text in enumerate(texts)])
+        if len(sections) == 1:
+            source = f"slide {sections[0][0] + 1}"
+            grouping_rule = ""
+        else:
+            source = "slides " + ', '.join(str(slide_index + 1) for slide_index, _ in sections)
+            grouping_rule = "\n- Items are grouped by slide; use only the same slide's items as context"
+        
+        payload = json.dumps({
+            'slides': [
+                {
+                    'slide': slide_index + 1,
+                    'items': [{'id': item_id, 'text': text} for item_id, text in items]
+                }
+                for slide_index, items in sections
+            ]
+        }, ensure_ascii=False)
         
-        prompt = f"""Translate the following Chinese text from slide {slide_index + 1} into natural, concise English used in PowerPoint slides.
+        prompt = f"""Translate the Chinese text items from {source} into natural, concise English used in PowerPoint slides.
 
 Rules:
 - Keep it short and presentation-style
 - Do NOT add explanations
 - Do NOT change numbers or symbols
 - Preserve bullet structure
-- Use consistent terminology within the same slide
-- Return ONLY the translated text, one item per line, in the same order as the input
-- Do NOT add line numbers or prefixes
-- Each line should be a direct translation of the corresponding Chinese text
+- Use consistent terminology within the same slide{grouping_rule}
+- Translate every item exactly once and keep its id
 
-Chinese text:
-{texts_str}
+Input JSON:
+{payload}
 
-Translated English (one line per item, same order):"""
+Return ONLY a JSON object in this format:
+{{"translations": [{{"id": "<item id>", "text": "<English translation>"}}]}}"""
         
         return prompt
     
@@ -163,20 +424,37 @@ Translated English (one line per item, same order):"""
         Returns:
             翻译后的文本
         """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional translator. Translate Chinese to English for PowerPoint presentations. Keep it concise and natural."
-                },
-                {
-                    "role": "user",
-                    "content": f"Translate this text: {text}\n\nReturn only the translation, no explanations."
-                }
-            ],
-            temperature=0.3
-        )
+        response = self._create_completion([
+            {
+                "role": "system",
+                "content": "You are a professional translator. Translate Chinese to English for PowerPoint presentations. Keep it concise and natural."
+            },
+            {
+                "role": "user",
+                "content": f"Translate this text: {text}\n\nReturn only the translation, no explanations."
+            }
+        ])
         
-        return response.choices[0].message.content.strip()
+        return response.content.strip()
+
+
+_default_translator = None
+_default_translator_lock = threading.Lock()
+
+
+def get_translator() -> Translator:
+    """
+    获取进程内共享的翻译器（按环境变量配置）
+
+    翻译器本身不保存任务状态，所有任务共用同一个后端、记忆库和请求调度器。
+
+    Returns:
+        翻译器实例
+    """
+    global _default_translator
 
+    if _default_translator is None:
+        with _default_translator_lock:
+            if _default_translator is None:
+                _default_translator = Translator()
+    return _default_translator
@@ -0,0 +1,120 @@
+"""
+上传处理模块 - 上传文件边接收边写入磁盘
+接收时同时计算SHA-256，写完后在解析PPT之前先校验ZIP结构
+"""
+import os
+import uuid
+import hashlib
+import zipfile
+from typing import Optional
+
+from flask import Request
+
+
+UPLOAD_DIR = 'uploads'
+# 单次请求的最大字节数（Flask的 MAX_CONTENT_LENGTH）
+MAX_UPLOAD_BYTES = int(float(os.getenv('MAX_UPLOAD_MB', '300')) * 1024 * 1024)
+# 解压后的总大小上限，防止压缩炸弹
+MAX_UNCOMPRESSED_BYTES = int(float(os.getenv('MAX_UNCOMPRESSED_MB', '2048')) * 1024 * 1024)
+
+# PPTX包中必须存在的部件
+REQUIRED_PARTS = ('[Content_Types].xml', 'ppt/presentation.xml')
+
+
+class HashingFileStream:
+    """
+    上传文件流类 - 写入 uploads/ 下的临时文件并同时计算哈希
+
+    未调用 persist() 的临时文件在关闭时删除（Flask在请求结束时关闭上传文件），
+    所以被拒绝的上传不会留在磁盘上。
+    """
+
+    def __init__(self, directory: str = UPLOAD_DIR):
+        """
+        初始化上传文件流
+
+        Args:
+            directory: 临时文件所在目录（与最终文件同一文件系统，便于原子改名）
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'.upload-{uuid.uuid4().hex}.part')
+        self._file = open(self.path, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.persisted = False
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self) -> str:
+        """已接收内容的SHA-256"""
+        return self._hash.hexdigest()
+
+    def persist(self, path: str) -> str:
+        """
+        把临时文件改名为最终路径（不再复制一遍）
+
+        Args:
+            path: 目标路径
+
+        Returns:
+            目标路径
+        """
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+        self.persisted = True
+        return path
+
+    def close(self):
+        self._file.close()
+        if not self.persisted and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getattr__(self, name):
+        # read/seek/tell等操作直接交给底层文件
+        return getattr(self._file, name)
+
+
+class StreamingRequest(Request):
+    """请求类 - 上传文件直接流式写入磁盘，不在内存中缓冲"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return HashingFileStream()
+
+
+def validate_pptx(path: str, max_uncompressed: int = MAX_UNCOMPRESSED_BYTES) -> Optional[str]:
+    """
+    在解析之前检查上传文件是否是合法的PPTX包
+
+    只读取ZIP的中央目录，不解压任何内容。
+
+    Args:
+        path: 文件路径
+        max_uncompressed: 解压后的总大小上限（字节）
+
+    Returns:
+        错误信息，合法时返回None
+    """
+    if not zipfile.is_zipfile(path):
+        return '文件不是有效的PPTX（ZIP）格式，旧版.ppt请先另存为.pptx'
+
+    try:
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+    except (zipfile.BadZipFile, OSError) as e:
+        return f'文件已损坏: {e}'
+
+    names = {info.filename for info in infos}
+    missing = [part for part in REQUIRED_PARTS if part not in names]
+    if missing:
+        return f'文件缺少PPTX必需部件: {", ".join(missing)}'
+
+    if sum(info.file_size for info in infos) > max_uncompressed:
+        return '文件解压后过大'
+
+    return None
@@ -0,0 +1,402 @@
+"""
+XML文本提取模块 - 直接从ZIP中读取幻灯片XML提取可翻译文本
+不构建python-pptx的形状、段落、单元格对象，结果与PPTProcessor的python-pptx引擎一致
+文本单元不带对象引用，而是带部件名和元素路径，回填时再按路径定位
+"""
+import os
+import zipfile
+import threading
+import posixpath
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+
+NS_A = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+NS_P = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+NS_C = 'http://schemas.openxmlformats.org/drawingml/2006/chart'
+NS_R = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+TABLE_URI = 'http://schemas.openxmlformats.org/drawingml/2006/table'
+CHART_URI = 'http://schemas.openxmlformats.org/drawingml/2006/chart'
+
+
+def _qn(ns: str, tag: str) -> str:
+    return f'{{{ns}}}{tag}'
+
+
+A_P, A_R, A_BR, A_FLD, A_T = (_qn(NS_A, tag) for tag in ('p', 'r', 'br', 'fld', 't'))
+P_SP, P_GRPSP, P_GRAPHICFRAME = (_qn(NS_P, tag) for tag in ('sp', 'grpSp', 'graphicFrame'))
+# 与python-pptx的形状集合一致（决定shape_index）
+SHAPE_TAGS = {_qn(NS_P, tag) for tag in ('sp', 'grpSp', 'graphicFrame', 'cxnSp', 'pic', 'contentPart')}
+R_ID = _qn(NS_R, 'id')
+
+# 不可信输入，禁止解析外部实体
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+
+# 幻灯片数达到该值时使用多进程并行提取，否则串行
+PARALLEL_EXTRACT_MIN_SLIDES = int(os.getenv('PARALLEL_EXTRACT_MIN_SLIDES', '100'))
+# 提取进程数，0表示使用CPU核数
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', '0'))
+# 每个进程分到的幻灯片段数（段越多负载越均衡，进程间传输次数也越多）
+CHUNKS_PER_WORKER = 4
+
+
+def paragraph_text(p) -> str:
+    """
+    段落文本（与python-pptx的 _Paragraph.text 一致：run和域的文本，软换行为\\v）
+
+    Args:
+        p: a:p 元素
+
+    Returns:
+        段落文本
+    """
+    parts = []
+    for child in p:
+        if child.tag in (A_R, A_FLD):
+            t = child.find(A_T)
+            parts.append(t.text or '' if t is not None else '')
+        elif child.tag == A_BR:
+            parts.append('\v')
+    return ''.join(parts)
+
+
+def text_body_text(body) -> str:
+    """
+    文本框文本（与python-pptx的 TextFrame.text 一致：段落之间用\\n连接）
+
+    Args:
+        body: p:txBody、a:txBody 或 c:rich 元素，可以为None
+
+    Returns:
+        文本
+    """
+    if body is None:
+        return ''
+    return '\n'.join(paragraph_text(p) for p in body.iterchildren(A_P))
+
+
+def rels_path(part_name: str) -> str:
+    """
+    部件的关系文件在ZIP中的路径
+
+    Args:
+        part_name: 部件名（如 /ppt/slides/slide1.xml）
+
+    Returns:
+        关系文件路径（如 ppt/slides/_rels/slide1.xml.rels）
+    """
+    directory, filename = posixpath.split(part_name.lstrip('/'))
+    return posixpath.join(directory, '_rels', f'{filename}.rels')
+
+
+def read_rels(zf: zipfile.ZipFile, part_name: str) -> Dict[str, str]:
+    """
+    读取部件的关系，解析为目标部件名
+
+    Args:
+        zf: PPTX的ZIP对象
+        part_name: 部件名
+
+    Returns:
+        {关系ID: 目标部件名}，外部链接不包含在内
+    """
+    try:
+        root = etree.fromstring(zf.read(rels_path(part_name)), _PARSER)
+    except KeyError:
+        return {}
+
+    base = posixpath.dirname(part_name)
+    rels = {}
+    for rel in root.iterchildren(_qn(NS_REL, 'Relationship')):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            rels[rel.get('Id')] = posixpath.normpath(target)
+        else:
+            rels[rel.get('Id')] = posixpath.normpath(posixpath.join(base, target))
+    return rels
+
+
+def slide_part_names(zf: zipfile.ZipFile) -> List[str]:
+    """
+    按演示文稿中的顺序列出幻灯片部件名
+
+    Args:
+        zf: PPTX的ZIP对象
+
+    Returns:
+        幻灯片部件名列表（如 /ppt/slides/slide1.xml）
+    """
+    presentation = '/ppt/presentation.xml'
+    root = etree.fromstring(zf.read(presentation.lstrip('/')), _PARSER)
+    rels = read_rels(zf, presentation)
+
+    sld_id_lst = root.find(_qn(NS_P, 'sldIdLst'))
+    if sld_id_lst is None:
+        return []
+    return [rels[sld_id.get(R_ID)] for sld_id in sld_id_lst.iterchildren(_qn(NS_P, 'sldId'))]
+
+
+def read_part(zf: zipfile.ZipFile, part_name: str):
+    """
+    解析部件XML（直接从ZIP流读取）
+
+    Args:
+        zf: PPTX的ZIP对象
+        part_name: 部件名
+
+    Returns:
+        根元素
+    """
+    with zf.open(part_name.lstrip('/')) as stream:
+        return etree.parse(stream, _PARSER).getroot()
+
+
+class XMLExtractor:
+    """XML文本提取器类"""
+
+    def __init__(self, ppt_path: str, should_translate: Callable[[str], bool],
+                 workers: Optional[int] = None,
+                 min_parallel_slides: int = PARALLEL_EXTRACT_MIN_SLIDES):
+        """
+        初始化提取器
+
+        Args:
+            ppt_path: PPT文件路径
+            should_translate: 判断文本是否需要翻译的函数（并行提取时需要可pickle）
+            workers: 提取进程数，默认读取 EXTRACT_WORKERS（0表示CPU核数）
+            min_parallel_slides: 幻灯片数达到该值时并行提取
+        """
+        self.ppt_path = ppt_path
+        self.should_translate = should_translate
+        self.workers = workers if workers is not None else (EXTRACT_WORKERS or os.cpu_count() or 1)
+        self.min_parallel_slides = min_parallel_slides
+
+    def extract(self) -> List[Dict]:
+        """
+        提取所有幻灯片的可翻译文本
+
+        大PPT按连续的幻灯片段分给多个进程，结果按幻灯片顺序合并；
+        小PPT或单核时串行提取（进程间传输的开销大于收益）。
+
+        Returns:
+            与 PPTProcessor.extract_texts 相同结构的列表（不含fingerprint）
+        """
+        with zipfile.ZipFile(self.ppt_path) as zf:
+            parts = list(enumerate(slide_part_names(zf)))
+            if self.use_parallel(len(parts)):
+                results = self._extract_parallel(parts)
+            else:
+                results = [(slide_idx, self.extract_slide(zf, slide_idx, part_name))
+                           for slide_idx, part_name in parts]
+
+        return [{'slide_index': slide_idx, 'texts': slide_texts}
+                for slide_idx, slide_texts in results if slide_texts]
+
+    def use_parallel(self, slide_count: int) -> bool:
+        """
+        判断一份PPT是否使用多进程并行提取
+
+        Args:
+            slide_count: 整份PPT的幻灯片数（低内存模式按窗口提取时也按整份判断）
+
+        Returns:
+            True表示并行提取
+        """
+        return self.workers > 1 and slide_count >= self.min_parallel_slides
+
+    def submit_parts(self, parts: List[Tuple[int, str]]) -> List[Future]:
+        """
+        把幻灯片按连续的段提交到共享进程池，不等待结果
+
+        Args:
+            parts: (幻灯片索引, 部件名) 列表
+
+        Returns:
+            按段顺序排列的Future，每个结果为该段的 (幻灯片索引, 文本单元列表) 列表
+        """
+        if not parts:
+            return []
+        chunk_count = min(len(parts), self.workers * CHUNKS_PER_WORKER)
+        size = -(-len(parts) // chunk_count)
+        pool = get_extract_pool(self.workers)
+        return [pool.submit(_extract_chunk, (self.ppt_path, self.should_translate, parts[i:i + size]))
+                for i in range(0, len(parts), size)]
+
+    def _extract_parallel(self, parts: List[Tuple[int, str]]) -> List[Tuple[int, List[Dict]]]:
+        """在进程池中按幻灯片段提取，返回按顺序排列的 (幻灯片索引, 文本单元列表)"""
+        results = []
+        for future in self.submit_parts(parts):
+            results.extend(future.result())
+        return results
+
+    def extract_slide(self, zf: zipfile.ZipFile, slide_idx: int, part_name: str,
+                      root=None) -> List[Dict]:
+        """
+        提取单张幻灯片的文本单元
+
+        Args:
+            zf: PPTX的ZIP对象
+            slide_idx: 幻灯片索引
+            part_name: 幻灯片部件名
+            root: 已解析的幻灯片根元素（不提供时从ZIP读取）
+
+        Returns:
+            文本单元列表，每个单元带 part（部件名）和 path（部件内的元素路径）
+        """
+        if root is None:
+            root = read_part(zf, part_name)
+        tree = root.getroottree()
+        sp_tree = root.find(f'{_qn(NS_P, "cSld")}/{_qn(NS_P, "spTree")}')
+        if sp_tree is None:
+            return []
+
+        slide_texts = []
+        rels = None
+
+        def add(element, **fields):
+            text = fields['text']
+            if text and self.should_translate(text):
+                fields.update({'slide_index': slide_idx, 'part': part_name,
+                               'path': tree.getelementpath(element)})
+                slide_texts.append(fields)
+
+        for shape_idx, shape in enumerate(child for child in sp_tree if child.tag in SHAPE_TAGS):
+            # 文本框（包括占位符）
+            if shape.tag == P_SP:
+                for para_idx, p in enumerate(self._paragraphs(shape)):
+                    add(p, shape_index=shape_idx, paragraph_index=para_idx,
+                        text=paragraph_text(p).strip(), text_type='textbox')
+
+            # 组合形状中的文本（只处理一层，与python-pptx引擎一致）
+            elif shape.tag == P_GRPSP:
+                sub_shapes = (child for child in shape if child.tag in SHAPE_TAGS)
+                for sub_shape_idx, sub_shape in enumerate(sub_shapes):
+                    if sub_shape.tag != P_SP:
+                        continue
+                    for para_idx, p in enumerate(self._paragraphs(sub_shape)):
+                        add(p, shape_index=shape_idx, sub_shape_index=sub_shape_idx,
+                            paragraph_index=para_idx, text=paragraph_text(p).strip(),
+                            text_type='group_textbox')
+
+            elif shape.tag == P_GRAPHICFRAME:
+                graphic_data = shape.find(f'{_qn(NS_A, "graphic")}/{_qn(NS_A, "graphicData")}')
+                uri = graphic_data.get('uri') if graphic_data is not None else None
+
+                # 表格
+                if uri == TABLE_URI:
+                    tbl = graphic_data.find(_qn(NS_A, 'tbl'))
+                    rows = tbl.iterchildren(_qn(NS_A, 'tr')) if tbl is not None else ()
+                    for row_idx, tr in enumerate(rows):
+                        for col_idx, tc in enumerate(tr.iterchildren(_qn(NS_A, 'tc'))):
+                            add(tc, shape_index=shape_idx, row_index=row_idx, col_index=col_idx,
+                                text=text_body_text(tc.find(_qn(NS_A, 'txBody'))).strip(),
+                                text_type='table')
+
+                # 图表
+                elif uri == CHART_URI:
+                    if rels is None:
+                        rels = read_rels(zf, part_name)
+                    try:
+                        self._extract_chart(zf, graphic_data, rels, shape_idx, add, shape)
+                    except Exception:
+                        # 图表处理可能失败，忽略错误继续处理其他形状
+                        pass
+
+        return slide_texts
+
+    @staticmethod
+    def _paragraphs(sp):
+        """形状文本框中的段落"""
+        body = sp.find(_qn(NS_P, 'txBody'))
+        return body.iterchildren(A_P) if body is not None else ()
+
+    def _extract_chart(self, zf: zipfile.ZipFile, graphic_data, rels: Dict[str, str],
+                       shape_idx: int, add: Callable, frame):
+        """
+        提取图表标题和坐标轴标题
+
+        与python-pptx引擎的行为保持一致：没有坐标轴的图表（如饼图）只提取标题；
+        value轴在有多个时取第二个；图例没有可读取的文本。
+        """
+        chart_part = rels[graphic_data.find(_qn(NS_C, 'chart')).get(R_ID)]
+        chart_space = read_part(zf, chart_part)
+        chart_tree = chart_space.getroottree()
+        chart = chart_space.find(_qn(NS_C, 'chart'))
+
+        def add_title(owner, **fields):
+            title = owner.find(_qn(NS_C, 'title'))
+            if title is None:
+                return
+            rich = title.find(f'{_qn(NS_C, "tx")}/{_qn(NS_C, "rich")}')
+            add(frame, shape_index=shape_idx, text=text_body_text(rich).strip(),
+                chart_part=chart_part, chart_path=chart_tree.getelementpath(title), **fields)
+
+        # 图表标题
+        add_title(chart, text_type='chart_title')
+
+        plot_area = chart.find(_qn(NS_C, 'plotArea'))
+        if plot_area is None:
+            return
+
+        # 坐标轴标题（分类轴依次取catAx、dateAx、valAx）
+        val_axes = plot_area.findall(_qn(NS_C, 'valAx'))
+        category_axis = plot_area.find(_qn(NS_C, 'catAx'))
+        if category_axis is None:
+            category_axis = plot_area.find(_qn(NS_C, 'dateAx'))
+        if category_axis is None and val_axes:
+            category_axis = val_axes[0]
+        if category_axis is None:
+            return
+        add_title(category_axis, text_type='chart_axis', axis_type='category')
+
+        if not val_axes:
+            return
+        add_title(val_axes[1] if len(val_axes) > 1 else val_axes[0],
+                  text_type='chart_axis', axis_type='value')
+
+
+def _extract_chunk(args: Tuple[str, Callable[[str], bool], List[Tuple[int, str]]]) -> List[Tuple[int, List[Dict]]]:
+    """进程池任务：在子进程中打开PPT并提取一段连续的幻灯片"""
+    ppt_path, should_translate, parts = args
+    extractor = XMLExtractor(ppt_path, should_translate, workers=1)
+    with zipfile.ZipFile(ppt_path) as zf:
+        return [(slide_idx, extractor.extract_slide(zf, slide_idx, part_name))
+                for slide_idx, part_name in parts]
+
+
+_extract_pool = None
+_extract_pool_workers = 0
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    获取进程内共享的提取进程池（按需创建，之后的任务复用已启动的进程）
+
+    使用spawn方式启动子进程：Web服务是多线程的，fork可能复制其他线程持有的锁。
+    spawn子进程会以 __mp_main__ 名称重新导入主模块（`python3 app.py` 时为app.py），
+    主模块中只属于服务进程的初始化需要放在 `if __name__ != '__mp_main__'` 之下。
+
+    Args:
+        workers: 进程数
+
+    Returns:
+        进程池
+    """
+    global _extract_pool, _extract_pool_workers
+
+    with _extract_pool_lock:
+        if _extract_pool is None or _extract_pool_workers != workers:
+            if _extract_pool is not None:
+                _extract_pool.shutdown(wait=False)
+            _extract_pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            _extract_pool_workers = workers
+        return _extract_pool
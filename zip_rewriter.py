@@ -0,0 +1,148 @@
+"""
+ZIP部件改写模块 - 保存PPT时只重写修改过的部件
+未修改的条目（图片、视频、版式等）按原始压缩字节直接复制，不解压也不重新压缩
+"""
+import os
+import copy
+import shutil
+import struct
+import zipfile
+from typing import Dict
+
+
+# 复制原始数据时的块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _copy_raw_entry(src_fp, info: zipfile.ZipInfo, zout: zipfile.ZipFile):
+    """
+    把源ZIP中的一个条目按原始压缩字节写入目标ZIP
+
+    Args:
+        src_fp: 源ZIP的文件对象
+        info: 源条目信息（来自中央目录）
+        zout: 目标ZIP（写模式）
+    """
+    # 本地文件头中的文件名和扩展字段长度可能与中央目录不同，按本地文件头跳过
+    src_fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, src_fp.read(zipfile.sizeFileHeader))
+    src_fp.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], 1)
+
+    entry = copy.copy(info)
+    entry.header_offset = zout.fp.tell()
+    # zip64扩展字段由FileHeader按需重新生成
+    entry.extra = zipfile._strip_extra(info.extra, (1,))
+    # 大小和CRC直接写在本地文件头中，不再使用数据描述符
+    entry.flag_bits &= ~0x08
+    zout.fp.write(entry.FileHeader())
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src_fp.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"条目数据不完整: {info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    zout.filelist.append(entry)
+    zout.NameToInfo[entry.filename] = entry
+    zout.start_dir = zout.fp.tell()
+
+
+class ZipRewriter:
+    """
+    逐条写出新的ZIP文件（上下文管理器）
+
+    调用方按需要的顺序对源条目调用copy（原始字节复制）或write（新内容重新压缩），
+    退出时把临时文件改名为目标文件；出现异常时删除临时文件，目标文件保持不变。
+    """
+
+    def __init__(self, src_path: str, dst_path: str):
+        """
+        初始化ZIP改写器
+
+        Args:
+            src_path: 源文件路径
+            dst_path: 目标文件路径（可以与源路径相同）
+        """
+        self.src_path = src_path
+        self.dst_path = dst_path
+        self.tmp_path = dst_path + '.tmp'
+        self.source = None
+        self._zout = None
+
+    def __enter__(self) -> 'ZipRewriter':
+        self.source = zipfile.ZipFile(self.src_path)
+        try:
+            self._zout = zipfile.ZipFile(self.tmp_path, 'w', zipfile.ZIP_DEFLATED)
+        except Exception:
+            self.source.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._zout.close()
+        self.source.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.dst_path)
+        else:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+    def copy(self, info: zipfile.ZipInfo):
+        """
+        按原始压缩字节复制源条目
+
+        Args:
+            info: 源条目信息
+        """
+        _copy_raw_entry(self.source.fp, info, self._zout)
+
+    def write(self, info: zipfile.ZipInfo, blob: bytes):
+        """
+        用新内容写入源条目（保留条目名、时间和属性）
+
+        Args:
+            info: 源条目信息
+            blob: 新内容
+        """
+        entry = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        entry.external_attr = info.external_attr
+        self._zout.writestr(entry, blob, compress_type=zipfile.ZIP_DEFLATED)
+
+
+def rewrite_zip(src_path: str, dst_path: str, replacements: Dict[str, bytes]) -> int:
+    """
+    复制ZIP文件，替换指定条目的内容
+
+    条目顺序保持不变；被替换的条目重新压缩，其余条目原样复制。
+    先写入临时文件再改名，目标路径可以与源路径相同。
+
+    Args:
+        src_path: 源文件路径
+        dst_path: 目标文件路径
+        replacements: {条目名（不带开头的/）: 新内容}
+
+    Returns:
+        实际替换的条目数
+    """
+    if not replacements:
+        tmp_path = dst_path + '.tmp'
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)
+        return 0
+
+    replaced = 0
+    with ZipRewriter(src_path, dst_path) as rewriter:
+        for info in rewriter.source.infolist():
+            blob = replacements.get(info.filename)
+            if blob is None:
+                rewriter.copy(info)
+            else:
+                rewriter.write(info, blob)
+                replaced += 1
+
+    return replaced